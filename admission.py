@@ -0,0 +1,196 @@
+# admission.py
+# Admission control for upstream calls: per-host limits, fair per-session queueing, load shedding
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+import httpx
+from mcp.server.lowlevel.server import request_ctx
+
+from config import (
+    ADMISSION_BURST,
+    ADMISSION_HOST_LIMITS,
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE_SECONDS,
+    ADMISSION_RATE_PER_SECOND,
+)
+from metrics import ADMISSION_QUEUED, ADMISSION_SHED, ADMISSION_WAIT
+from resilience import remaining
+
+
+class Overloaded(httpx.TransportError):
+    """The upstream host is saturated and the call could not finish in its time budget."""
+    category = "shed_busy"
+
+
+def session_key() -> int | None:
+    """Identify the MCP session of the current tool call (``None`` outside of one)."""
+    try:
+        return id(request_ctx.get().session)
+    except LookupError:
+        return None
+
+
+class HostScheduler:
+    """Gatekeeper in front of one upstream host.
+
+    A request starts only when fewer than ``max_concurrency`` are running
+    and the token bucket (``rate`` per second, up to ``burst``) has a token.
+    Waiting requests are queued per MCP session and served round robin, so
+    a session firing many calls only delays itself. A request is refused
+    (``Overloaded``) as soon as its turn is not expected within
+    ``max_wait`` seconds or before its time budget runs out, and again if
+    it is still queued when that time is up, so queueing delay stays
+    bounded however high the load.
+    """
+
+    def __init__(self, host: str, max_concurrency: int, rate: float, burst: float, max_wait: float):
+        self.host = host
+        self.max_wait = max_wait
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.active = 0
+        # Running estimate of how long a request holds its slot
+        self.service_time = 0.1
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._queues: OrderedDict[object, deque[asyncio.Future]] = OrderedDict()
+        self._waiting = 0
+        self._timer: asyncio.TimerHandle | None = None
+
+    @asynccontextmanager
+    async def slot(self, granted: bool = False):
+        """Hold one request slot for the enclosed upstream call.
+
+        ``granted`` means the slot was already taken with ``try_acquire``.
+        """
+        if not granted:
+            await self.acquire(session_key())
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+    def try_acquire(self) -> bool:
+        """Take a slot only if one is free right now (for optional requests such as hedges)."""
+        if self._waiting or not self._can_start():
+            return False
+        self._start()
+        return True
+
+    async def acquire(self, key) -> None:
+        if self.try_acquire():
+            return
+        left = remaining()
+        # Leave enough of the budget for the call itself
+        patience = self.max_wait if left is None else min(self.max_wait, left - self.service_time)
+        if self.estimated_wait(key) > patience:
+            ADMISSION_SHED.inc(upstream=self.host, reason="predicted")
+            raise Overloaded(f"{self.host} is busy")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(future)
+        self._waiting += 1
+        ADMISSION_QUEUED.inc(upstream=self.host)
+        self._schedule()
+        started = time.monotonic()
+        try:
+            await asyncio.wait({future}, timeout=patience)
+        except asyncio.CancelledError:
+            self._withdraw(key, future)
+            raise
+        finally:
+            ADMISSION_QUEUED.dec(upstream=self.host)
+        if not future.done():
+            self._withdraw(key, future)
+            ADMISSION_SHED.inc(upstream=self.host, reason="timeout")
+            raise Overloaded(f"{self.host} is busy")
+        ADMISSION_WAIT.observe(time.monotonic() - started, upstream=self.host)
+
+    def release(self, service_time: float) -> None:
+        self.active -= 1
+        self.service_time += 0.1 * (service_time - self.service_time)
+        self._dispatch()
+
+    def estimated_wait(self, key) -> float:
+        """Seconds until a new request of session ``key`` would start."""
+        own = len(self._queues.get(key, ()))
+        # Round robin: every other session gets at most as many turns as this one
+        ahead = own + sum(min(len(queue), own + 1) for other, queue in self._queues.items() if other != key)
+        self._refill()
+        token_wait = max(0.0, (ahead + 1 - self._tokens) / self.rate)
+        slot_wait = (ahead // self.max_concurrency + (self.active >= self.max_concurrency)) * self.service_time
+        return max(token_wait, slot_wait)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _can_start(self) -> bool:
+        if self.active >= self.max_concurrency:
+            return False
+        self._refill()
+        return self._tokens >= 1
+
+    def _start(self) -> None:
+        self.active += 1
+        self._tokens -= 1
+
+    def _dispatch(self) -> None:
+        while self._waiting and self._can_start():
+            key, queue = next(iter(self._queues.items()))
+            future = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._start()
+            future.set_result(None)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Wake up when the next token arrives if requests wait only for tokens."""
+        if self._timer is not None or not self._waiting or self.active >= self.max_concurrency:
+            return
+        self._refill()
+        delay = max(0.0, (1 - self._tokens) / self.rate)
+        self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _withdraw(self, key, future: asyncio.Future) -> None:
+        """Give up a queued request, or the slot it was granted meanwhile."""
+        if future.done():
+            self.release(self.service_time)
+            return
+        future.cancel()
+        queue = self._queues.get(key)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[key]
+
+
+_schedulers: dict[str, HostScheduler] = {}
+
+
+def get_scheduler(host: str) -> HostScheduler:
+    scheduler = _schedulers.get(host)
+    if scheduler is None:
+        limits = ADMISSION_HOST_LIMITS.get(host, {})
+        scheduler = _schedulers[host] = HostScheduler(
+            host,
+            int(limits.get("concurrency", ADMISSION_MAX_CONCURRENCY)),
+            float(limits.get("rate", ADMISSION_RATE_PER_SECOND)),
+            float(limits.get("burst", ADMISSION_BURST)),
+            float(limits.get("max_wait", ADMISSION_MAX_QUEUE_SECONDS)),
+        )
+    return scheduler
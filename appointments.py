@@ -0,0 +1,92 @@
+# appointments.py
+# Durable appointment store backed by SQLite
+import asyncio
+import os
+import sqlite3
+import threading
+
+from config import APPOINTMENTS_DB_PATH
+
+
+class AppointmentStore:
+    """Appointments in an SQLite database running in WAL mode.
+
+    A unique index on (salon id, date, grid slot) makes booking a single
+    atomic ``INSERT OR IGNORE``: whichever coroutine (or process) inserts
+    first wins the slot and the others see it taken, with no read-then-write
+    race. Keying on the resolved salon and the slot in minutes (not the
+    strings the user typed) means "82 tran dai nghia" at 9:00 and "82 Trần
+    Đại Nghĩa" at 09:10 compete for the same slot. A second index on phone
+    keeps cancellation an index lookup.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS appointments ("
+                "id INTEGER PRIMARY KEY, branch TEXT NOT NULL, date TEXT NOT NULL, "
+                "time TEXT NOT NULL, phone TEXT NOT NULL)"
+            )
+            columns = {row[1] for row in db.execute("PRAGMA table_info(appointments)")}
+            # Databases created before bookings were keyed by salon id and slot
+            if "salon_id" not in columns:
+                db.execute("ALTER TABLE appointments ADD COLUMN salon_id INTEGER")
+            if "slot" not in columns:
+                db.execute("ALTER TABLE appointments ADD COLUMN slot INTEGER")
+            db.execute("DROP INDEX IF EXISTS appointments_slot")
+            db.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS appointments_salon_slot "
+                "ON appointments (salon_id, date, slot)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS appointments_phone ON appointments (phone)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _book(self, salon_id: int, branch: str, date: str, slot: int, time: str, phone: str) -> bool:
+        with self._lock:
+            db = self._connect()
+            cursor = db.execute(
+                "INSERT OR IGNORE INTO appointments (salon_id, branch, date, slot, time, phone) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (salon_id, branch, date, slot, time, phone),
+            )
+            db.commit()
+            return cursor.rowcount == 1
+
+    def _cancel(self, phone: str) -> list[dict]:
+        with self._lock:
+            db = self._connect()
+            rows = db.execute(
+                "DELETE FROM appointments WHERE phone = ? RETURNING salon_id, branch, date, time", (phone,)
+            ).fetchall()
+            db.commit()
+        return [
+            {"salon_id": salon_id, "branch": branch, "date": date, "time": time, "phone": phone}
+            for salon_id, branch, date, time in rows
+        ]
+
+    async def book(self, salon_id: int, branch: str, date: str, slot: int, time: str, phone: str) -> bool:
+        """Reserve ``slot`` (minutes since 00:00, on the booking grid) at a salon.
+
+        ``branch`` and ``time`` are kept for display. Returns ``False`` if the
+        slot is already taken.
+        """
+        return await asyncio.to_thread(self._book, salon_id, branch, date, slot, time, phone)
+
+    async def cancel(self, phone: str) -> list[dict]:
+        """Delete every appointment of ``phone`` and return the removed ones."""
+        return await asyncio.to_thread(self._cancel, phone)
+
+
+appointment_store = AppointmentStore(APPOINTMENTS_DB_PATH)
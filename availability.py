@@ -0,0 +1,156 @@
+# availability.py
+# Short-lived cache of book-hours-group snapshots with request coalescing
+import asyncio
+import contextvars
+import time
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+import upstream
+from config import (
+    AVAILABILITY_LOCAL_TTL_SECONDS,
+    AVAILABILITY_MAX_ENTRIES,
+    AVAILABILITY_STALE_SECONDS,
+    AVAILABILITY_TTL_SECONDS,
+    BOOK_HOURS_URL,
+    TOOL_DEADLINE_SECONDS,
+)
+from hotlist import hot_list
+from metrics import STEP_LATENCY, cache_result, span
+from resilience import DeadlineExceeded, deadline, remaining
+from shared_store import shared_cache
+from timeline import SlotTimeline
+
+Key = tuple[Any, str]
+
+
+class AvailabilityCache:
+    """Per (salonId, bookDate) slot timelines kept for a few seconds.
+
+    Concurrent lookups of the same key share one in-flight upstream request
+    (single-flight), so a burst of users asking about a popular salon costs a
+    single call. ``invalidate`` drops a key after a booking changes it.
+    Expired entries are kept ``stale_for`` more seconds and returned when the
+    upstream call fails (error, timeout or open circuit breaker).
+
+    The shared load belongs to no caller: it runs in a fresh context with its
+    own ``load_budget``, so it is not cut short by (nor queued as part of the
+    session of) whichever caller happened to start it. Each caller still
+    stops waiting when its own deadline is up.
+    """
+
+    def __init__(self, ttl: float, max_entries: int, stale_for: float = 0,
+                 load_budget: float = TOOL_DEADLINE_SECONDS):
+        self.ttl = ttl
+        self.load_budget = load_budget
+        self.max_entries = max_entries
+        self.stale_for = stale_for
+        self._entries: dict[Key, tuple[float, Any]] = {}
+        self._inflight: dict[Key, asyncio.Task] = {}
+
+    async def get(self, key: Key, load: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            cache_result("availability", "hit")
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            cache_result("availability", "coalesced")
+        else:
+            cache_result("availability", "miss")
+            task = asyncio.get_running_loop().create_task(self._load(load), context=contextvars.Context())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, key=key: self._store(key, t))
+        try:
+            # Shield the shared task so one cancelled caller does not cancel the others
+            left = remaining()
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), None if left is None else max(left, 0))
+            except TimeoutError:
+                raise DeadlineExceeded(f"no time left waiting for {key}") from None
+        except httpx.HTTPError:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] + self.stale_for > time.monotonic():
+                cache_result("availability", "stale")
+                return entry[1]
+            raise
+
+    async def _load(self, load: Callable[[], Awaitable[Any]]) -> Any:
+        with deadline(self.load_budget):
+            return await load()
+
+    def invalidate(self, key: Key) -> None:
+        self._entries.pop(key, None)
+        # A request already in flight may predate the change: let it finish
+        # for its current waiters but do not hand it to new callers
+        self._inflight.pop(key, None)
+
+    def _store(self, key: Key, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is not task:
+            return
+        del self._inflight[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        if len(self._entries) >= self.max_entries:
+            self._evict()
+        self._entries[key] = (time.monotonic() + self.ttl, task.result())
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at + self.stale_for <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+
+availability_cache = AvailabilityCache(
+    AVAILABILITY_LOCAL_TTL_SECONDS if shared_cache is not None else AVAILABILITY_TTL_SECONDS,
+    AVAILABILITY_MAX_ENTRIES,
+    AVAILABILITY_STALE_SECONDS,
+)
+
+
+def shared_key(salon_id: int, book_date: str) -> str:
+    return f"availability:{salon_id}:{book_date}"
+
+
+async def get_timeline(salon_id: int, book_date: str, time_request: str, record: bool = True) -> SlotTimeline:
+    """Return the slot timeline of a salon for one day.
+
+    The upstream answer covers the whole day, so ``time_request`` only goes
+    along with the request that actually reaches the API. In multi-worker
+    mode the raw answer is also kept in the shared cache for the other workers.
+    ``record=False`` keeps the call out of the hot list (warm-up prefills).
+    """
+    async def load() -> SlotTimeline:
+        key = shared_key(salon_id, book_date)
+        body = await shared_cache.get(key) if shared_cache is not None else None
+        fetched = body is None
+        if shared_cache is not None:
+            cache_result("availability_shared", "miss" if fetched else "hit")
+        if fetched:
+            response = await upstream.get(
+                BOOK_HOURS_URL,
+                params={"salonId": salon_id, "bookDate": book_date, "timeRequest": time_request}
+            )
+            body = response.content
+        data = upstream.decode_json(body)
+        with STEP_LATENCY.time(step="timeline_build"), span("timeline_build"):
+            timeline = SlotTimeline.from_hour_groups(data["data"]["hourGroup"])
+        # Share only answers that parsed
+        if fetched and shared_cache is not None:
+            await shared_cache.put(key, body, AVAILABILITY_TTL_SECONDS)
+        return timeline
+
+    if record:
+        hot_list.record_salon(salon_id)
+    return await availability_cache.get((salon_id, book_date), load)
+
+
+async def invalidate_timeline(salon_id: int, book_date: str) -> None:
+    """Forget the snapshot of one salon and day, in every worker."""
+    availability_cache.invalidate((salon_id, book_date))
+    if shared_cache is not None:
+        await shared_cache.delete(shared_key(salon_id, book_date))
@@ -0,0 +1,161 @@
+# bench/fake_upstream.py
+# Local stand-in for the salon catalog, HERE geocoder and book-hours-group APIs
+"""Serve synthetic upstream data so the MCP server can be benchmarked offline.
+
+    python bench/fake_upstream.py --port 9100 --salons 3000 --latency-ms 40 --error-rate 0.01
+
+Point the server at it with:
+
+    SALON_CATALOG_URL=http://127.0.0.1:9100/configs/get_all_salon.json
+    HERE_GEOCODE_URL=http://127.0.0.1:9100/geocode
+    BOOK_HOURS_URL=http://127.0.0.1:9100/book-hours-group
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "gazetteer.json")
+STREETS = ["Lê Lợi", "Nguyễn Trãi", "Trần Hưng Đạo", "Hai Bà Trưng", "Lý Thường Kiệt",
+           "Điện Biên Phủ", "Cách Mạng Tháng 8", "Quang Trung", "Phan Đình Phùng", "Võ Văn Tần"]
+
+
+def stable_random(*parts) -> random.Random:
+    """Random generator seeded from the given values (same input, same output)."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def build_catalog(count: int, seed: int) -> dict:
+    """Synthetic get_all_salon.json with salons spread around known districts."""
+    with open(GAZETTEER_PATH, encoding="utf-8") as f:
+        gazetteer = json.load(f)
+    provinces = {p["name"]: p for p in gazetteer["provinces"]}
+    # Big cities get most salons, like the real network
+    areas = [(d, provinces[d["province"]]) for d in gazetteer["districts"]]
+    weights = [8 if p["city_id"] in (1, 62) else 1 for _, p in areas]
+
+    rng = random.Random(seed)
+    salons = []
+    for salon_id in range(1, count + 1):
+        district, province = rng.choices(areas, weights)[0]
+        salons.append({
+            "id": salon_id,
+            "cityId": province["city_id"],
+            "latitude": round(district["lat"] + rng.uniform(-0.03, 0.03), 6),
+            "longitude": round(district["lng"] + rng.uniform(-0.03, 0.03), 6),
+            "addressNew": f"{salon_id} {rng.choice(STREETS)}, {district['name']}, {province['name']}",
+            # Fields the server ignores, to keep the document realistically large
+            "name": f"Salon {salon_id}",
+            "phone": f"0{rng.randrange(10**8, 10**9)}",
+            "openTime": "08:00",
+            "closeTime": "20:30",
+            "images": [f"https://example.invalid/salons/{salon_id}/{i}.jpg" for i in range(3)],
+        })
+    return {"count": len(salons), "data": salons}
+
+
+def build_app(args: argparse.Namespace) -> Starlette:
+    catalog = build_catalog(args.salons, args.seed)
+    # The real file is served with a UTF-8 BOM
+    catalog_body = b"\xef\xbb\xbf" + json.dumps(catalog, ensure_ascii=False).encode("utf-8")
+    catalog_etag = '"' + hashlib.blake2b(catalog_body, digest_size=8).hexdigest() + '"'
+    with open(GAZETTEER_PATH, encoding="utf-8") as f:
+        provinces = json.load(f)["provinces"]
+
+    async def upstream_delay() -> Response | None:
+        """Apply latency and error injection; return an error response if one is due."""
+        delay = args.latency_ms + random.uniform(0, args.jitter_ms)
+        if random.random() < args.slow_rate:
+            delay += args.slow_ms
+        await asyncio.sleep(delay / 1000)
+        if random.random() < args.error_rate:
+            return JSONResponse({"message": "injected failure"}, status_code=503)
+        return None
+
+    async def get_all_salon(request: Request) -> Response:
+        error = await upstream_delay()
+        if error is not None:
+            return error
+        if request.headers.get("if-none-match") == catalog_etag:
+            return Response(status_code=304, headers={"ETag": catalog_etag})
+        return Response(catalog_body, media_type="application/json", headers={"ETag": catalog_etag})
+
+    async def geocode(request: Request) -> Response:
+        error = await upstream_delay()
+        if error is not None:
+            return error
+        query = request.query_params.get("q", "")
+        rng = stable_random("geocode", query)
+        if rng.random() < args.geocode_miss_rate:
+            return JSONResponse({"items": []})
+        province = rng.choice(provinces)
+        return JSONResponse({"items": [{
+            "title": query,
+            "address": {"county": province["name"]},
+            "position": {
+                "lat": province["lat"] + rng.uniform(-0.05, 0.05),
+                "lng": province["lng"] + rng.uniform(-0.05, 0.05),
+            },
+        }]})
+
+    async def book_hours_group(request: Request) -> Response:
+        error = await upstream_delay()
+        if error is not None:
+            return error
+        salon_id = request.query_params.get("salonId")
+        book_date = request.query_params.get("bookDate")
+        hour_groups = []
+        for hour in range(8, 21):
+            hours = []
+            for minute in (0, 20, 40):
+                slot = hour * 60 + minute
+                rng = stable_random("slot", salon_id, book_date, slot)
+                hours.append({
+                    "hour": f"{hour}h{minute:02d}",
+                    "hourFrame": f"{hour:02d}:{minute:02d}",
+                    "hourId": slot,
+                    "subHourId": slot * 10 + 1,
+                    "isFree": rng.random() < args.free_ratio,
+                })
+            hour_groups.append({"name": str(hour), "hours": hours})
+        return JSONResponse({"data": {"hourGroup": hour_groups}})
+
+    return Starlette(routes=[
+        Route("/configs/get_all_salon.json", get_all_salon),
+        Route("/geocode", geocode),
+        Route("/book-hours-group", book_hours_group),
+    ])
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--salons", type=int, default=3000, help="number of synthetic salons")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=30, help="base latency of every response")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="uniform extra latency")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of responses delayed by --slow-ms")
+    parser.add_argument("--slow-ms", type=float, default=2000)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of responses failing with 503")
+    parser.add_argument("--free-ratio", type=float, default=0.5, help="fraction of free slots")
+    parser.add_argument("--geocode-miss-rate", type=float, default=0.02, help="fraction of unresolvable addresses")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    uvicorn.run(build_app(args), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
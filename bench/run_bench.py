@@ -0,0 +1,339 @@
+# bench/run_bench.py
+# Load driver: many concurrent MCP sessions against the SSE server in main.py
+"""Drive concurrent MCP sessions and report per-tool latency percentiles.
+
+Fully offline run (starts bench/fake_upstream.py and main.py itself):
+
+    python bench/run_bench.py --spawn --sessions 50 --duration 60 --output bench/results/today.json
+
+Against an already running server and fake upstream:
+
+    python bench/run_bench.py --url http://127.0.0.1:8000/sse --upstream http://127.0.0.1:9100
+
+Multi-worker mode (sessions are spread over the workers' own ports):
+
+    python bench/run_bench.py --spawn --workers 4 --sessions 100
+
+Compare with an earlier result (exits with status 1 on a p95 regression):
+
+    python bench/run_bench.py --spawn --output new.json --compare old.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "check_availability=40,get_near_salon=20,list_branches=10,check_availability_batch=10,find_earliest_slot=10,book_appointment=5,cancel_appointment=5"
+APOLOGY = "Dạ xin lỗi"
+BUSY = "Dạ hệ thống đang quá tải"
+STREETS = ["Lê Lợi", "Nguyễn Trãi", "Trần Hưng Đạo", "Hai Bà Trưng", "Quang Trung"]
+LOCAL_TZ = timezone(timedelta(hours=7))
+
+
+class Workload:
+    """Random but reproducible tool arguments drawn from the fake catalog."""
+
+    def __init__(self, salons: list[dict], cities: list[str], seed: int):
+        self.salons = salons
+        self.cities = cities
+        self.rng = random.Random(seed)
+        # A small pool of repeated addresses, like real users asking about the same places
+        self.addresses = [
+            (f"{self.rng.randrange(1, 300)} {self.rng.choice(STREETS)}", self.rng.choice(cities))
+            for _ in range(200)
+        ]
+        today = datetime.now(LOCAL_TZ)
+        self.dates = [(today + timedelta(days=i)).strftime("%d-%m-%Y") for i in range(4)]
+
+    def _time(self) -> str:
+        return f"{self.rng.randrange(8, 20):02d}:{self.rng.choice((0, 20, 40)):02d}"
+
+    def _branch(self) -> str:
+        return self.rng.choice(self.salons)["addressNew"]
+
+    def arguments(self, tool: str) -> dict:
+        if tool == "check_availability":
+            return {"branch": self._branch(), "date": self.rng.choice(self.dates), "time": self._time()}
+        if tool == "check_availability_batch":
+            branch, date = self._branch(), self.rng.choice(self.dates)
+            return {"queries": [{"branch": branch, "date": date, "time": self._time()} for _ in range(4)]}
+        if tool in ("get_near_salon", "find_earliest_slot"):
+            address, city = self.rng.choice(self.addresses)
+            return {"user_address": address, "city": city}
+        if tool == "book_appointment":
+            return {"branch": self._branch(), "date": self.rng.choice(self.dates), "time": self._time(),
+                    "phone": f"09{self.rng.randrange(10**7, 10**8)}"}
+        if tool == "cancel_appointment":
+            return {"phone": f"09{self.rng.randrange(10**7, 10**8)}"}
+        return {}
+
+
+def parse_mix(mix: str) -> tuple[list[str], list[float]]:
+    tools, weights = [], []
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        tools.append(name.strip())
+        weights.append(float(weight or 1))
+    return tools, weights
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(samples: list[float], errors: int, apologies: int, busy: int, elapsed: float) -> dict:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "errors": errors,
+        "apologies": apologies,
+        "busy": busy,
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(samples) / len(samples), 2) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 0.50), 2),
+        "p95_ms": round(percentile(samples, 0.95), 2),
+        "p99_ms": round(percentile(samples, 0.99), 2),
+        "max_ms": round(samples[-1], 2) if samples else 0.0,
+    }
+
+
+async def run_session(url: str, workload: Workload, tools: list[str], weights: list[float],
+                      deadline: float, warmup_until: float, stats: dict) -> None:
+    async with sse_client(url) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            while time.monotonic() < deadline:
+                tool = workload.rng.choices(tools, weights)[0]
+                arguments = workload.arguments(tool)
+                started = time.monotonic()
+                error = apology = busy = False
+                try:
+                    result = await session.call_tool(tool, arguments)
+                    error = result.isError
+                    texts = [getattr(c, "text", "") for c in result.content]
+                    apology = any(text.startswith(APOLOGY) for text in texts)
+                    # Shed calls; batch results carry the reply inside their JSON
+                    busy = any(BUSY in text for text in texts)
+                except Exception:  # noqa: BLE001 - any failure counts as an error sample
+                    error = True
+                elapsed_ms = (time.monotonic() - started) * 1000
+                if started < warmup_until:
+                    continue
+                entry = stats.setdefault(tool, {"samples": [], "errors": 0, "apologies": 0, "busy": 0})
+                entry["samples"].append(elapsed_ms)
+                entry["errors"] += error
+                entry["apologies"] += apology
+                entry["busy"] += busy
+
+
+async def run(args: argparse.Namespace) -> dict:
+    async with httpx.AsyncClient(timeout=30) as client:
+        response = await client.get(f"{args.upstream}/configs/get_all_salon.json")
+        response.raise_for_status()
+        salons = json.loads(response.content.decode("utf-8-sig"))["data"]
+    with open(os.path.join(ROOT, "gazetteer.json"), encoding="utf-8") as f:
+        cities = [p["name"] for p in json.load(f)["provinces"]]
+
+    tools, weights = parse_mix(args.mix)
+    stats: dict[str, dict] = {}
+    start = time.monotonic()
+    warmup_until = start + args.warmup
+    deadline = warmup_until + args.duration
+    urls = args.url.split(",")
+    sessions = [
+        run_session(urls[i % len(urls)], Workload(salons, cities, args.seed + i), tools, weights, deadline, warmup_until, stats)
+        for i in range(args.sessions)
+    ]
+    outcomes = await asyncio.gather(*sessions, return_exceptions=True)
+    failed_sessions = sum(isinstance(outcome, BaseException) for outcome in outcomes)
+    elapsed = max(time.monotonic() - warmup_until, 1e-9)
+
+    all_samples = [s for entry in stats.values() for s in entry["samples"]]
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "sessions": args.sessions,
+            "workers": len(urls),
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "mix": args.mix,
+            "seed": args.seed,
+            "failed_sessions": failed_sessions,
+        },
+        "overall": summarize(
+            all_samples,
+            sum(e["errors"] for e in stats.values()),
+            sum(e["apologies"] for e in stats.values()),
+            sum(e["busy"] for e in stats.values()),
+            elapsed,
+        ),
+        "tools": {
+            tool: summarize(entry["samples"], entry["errors"], entry["apologies"], entry["busy"], elapsed)
+            for tool, entry in sorted(stats.items())
+        },
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict) -> None:
+    header = f"{'tool':<26}{'count':>8}{'err':>6}{'busy':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in [*report["tools"].items(), ("(overall)", report["overall"])]:
+        print(f"{name:<26}{row['count']:>8}{row['errors']:>6}{row.get('busy', 0):>6}{row['throughput_rps']:>9}"
+              f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> bool:
+    """Print p95 changes against ``baseline``; return ``True`` if any regressed."""
+    regressed = False
+    print(f"\np95 vs {baseline['meta'].get('git_commit')} (threshold +{threshold:.0%})")
+    for name, row in report["tools"].items():
+        old = baseline["tools"].get(name)
+        if not old or not old["p95_ms"]:
+            continue
+        change = row["p95_ms"] / old["p95_ms"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        regressed |= bool(flag)
+        print(f"{name:<26}{old['p95_ms']:>9} -> {row['p95_ms']:<9}{change:+.1%} {flag}")
+    return regressed
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise TimeoutError(f"nothing listening on port {port}")
+
+
+def wait_until_ready(port: int, timeout: float = 60) -> None:
+    """Poll the server's readiness probe until its warm-up has finished."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"server on port {port} not ready")
+
+
+def spawn(args: argparse.Namespace, data_dir: str) -> list[subprocess.Popen]:
+    """Start the fake upstream and the MCP server pointed at it."""
+    upstream = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, "bench", "fake_upstream.py"),
+        "--port", str(args.upstream_port), *args.upstream_args.split(),
+    ])
+    wait_for_port(args.upstream_port)
+    base = f"http://127.0.0.1:{args.upstream_port}"
+    env = dict(
+        os.environ,
+        FASTMCP_PORT=str(args.server_port),
+        FASTMCP_LOG_LEVEL="WARNING",
+        DATA_DIR=data_dir,
+        SALON_CATALOG_URL=f"{base}/configs/get_all_salon.json",
+        HERE_GEOCODE_URL=f"{base}/geocode",
+        BOOK_HOURS_URL=f"{base}/book-hours-group",
+    )
+    # The fake upstream serves all three APIs from one host; the default
+    # admission limits (sized for the real APIs) would make the bench
+    # measure that throttle instead of the server
+    env.setdefault("ADMISSION_HOST_LIMITS", json.dumps(
+        {f"127.0.0.1:{args.upstream_port}": {"rate": 1_000_000, "burst": 1_000_000}}
+    ))
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--workers", str(args.workers)], cwd=ROOT, env=env
+    )
+    # A single server listens on the port itself, worker i on port + i
+    ports = [args.server_port + i for i in range(1, args.workers + 1)] if args.workers > 1 else [args.server_port]
+    for port in ports:
+        wait_for_port(port)
+        wait_until_ready(port)
+    args.upstream = base
+    args.url = ",".join(f"http://127.0.0.1:{port}/sse" for port in ports)
+    return [server, upstream]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000/sse",
+                        help="SSE endpoint of the server (comma-separated to spread sessions over workers)")
+    parser.add_argument("--upstream", default="http://127.0.0.1:9100", help="base URL of the fake upstream")
+    parser.add_argument("--spawn", action="store_true", help="start fake_upstream.py and main.py locally")
+    parser.add_argument("--server-port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="with --spawn: server worker processes")
+    parser.add_argument("--upstream-port", type=int, default=9100)
+    parser.add_argument("--upstream-args", default="", help="extra arguments for fake_upstream.py")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent MCP sessions")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="tool=weight,... call mix")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare p95 latencies with")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed relative p95 increase")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    processes = []
+    with tempfile.TemporaryDirectory() as data_dir:
+        try:
+            if args.spawn:
+                processes = spawn(args, data_dir)
+            report = asyncio.run(run(args))
+        finally:
+            for process in processes:
+                process.terminate()
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    # uvicorn keeps waiting for open SSE streams on shutdown
+                    process.kill()
+                    process.wait()
+
+    print_report(report)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            if compare(report, json.load(f), args.threshold):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
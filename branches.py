@@ -0,0 +1,120 @@
+# branches.py
+# Branch name -> salon id lookup, tolerant to missing diacritics and typos
+import re
+from collections import defaultdict
+
+from salons import SalonTable
+from utils import normalize_address, strip_diacritics
+
+# Below this score a fuzzy match is more likely a different salon than a typo
+MIN_FUZZY_SCORE = 0.6
+# Two candidates this close are ambiguous: better ask again than book the wrong one
+MIN_SCORE_MARGIN = 0.05
+# Grams shared by more than this fraction of names (province, district, "quan"...)
+# say nothing about which salon is meant; they are left out when picking candidates
+MAX_GRAM_SHARE = 0.05
+# Candidates kept from the rare-gram count for exact scoring
+FUZZY_CANDIDATES = 20
+
+HOUSE_NUMBER = re.compile(r"(?:so\.?\s*)?(\d+[a-z]?(?:\s*/\s*\d+[a-z]?)*)\b")
+
+
+def house_number(address: str) -> str | None:
+    """Leading house number of a raw address ("82", "12a", "45/3"), if any.
+
+    Read before normalization, which turns "45/3" into "45 3".
+    """
+    match = HOUSE_NUMBER.match(strip_diacritics(address).casefold().strip())
+    return re.sub(r"\s+", "", match.group(1)) if match else None
+
+
+def trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class BranchIndex:
+    """Resolve branch names (``addressNew``) to salon ids.
+
+    Lookups try, in order, an exact hash map, a map keyed by the normalized
+    name (accents stripped, case-folded, abbreviations expanded) and finally
+    a trigram index scored by the average of Dice similarity and how much
+    of the query is contained in the candidate name. A fuzzy match never
+    changes the house number: "28 Trần Đại Nghĩa" does not resolve to
+    "82 Trần Đại Nghĩa".
+    """
+
+    def __init__(self, salons: SalonTable):
+        self._exact: dict[str, int] = {}
+        self._normalized: dict[str, int] = {}
+        self._ids: list[int] = []
+        self._grams: list[set[str]] = []
+        self._numbers: list[str | None] = []
+        self._names: dict[int, str] = {}
+        self._postings: dict[str, list[int]] = defaultdict(list)
+        for salon_id, name in zip(salons.ids, salons.addresses):
+            if not name:
+                continue
+            normalized = normalize_address(name)
+            self._exact.setdefault(name, salon_id)
+            self._names.setdefault(salon_id, name)
+            self._normalized.setdefault(normalized, salon_id)
+
+            position = len(self._ids)
+            grams = trigrams(normalized)
+            self._ids.append(salon_id)
+            self._grams.append(grams)
+            self._numbers.append(house_number(name))
+            for gram in grams:
+                self._postings[gram].append(position)
+        # A small catalog still needs its unique grams
+        common = max(MAX_GRAM_SHARE * len(self._ids), 1)
+        self._rare = {gram for gram, positions in self._postings.items() if len(positions) <= common}
+
+    def resolve(self, branch: str) -> int | None:
+        """Return the salon id for ``branch``, or ``None`` if nothing matches well."""
+        salon_id = self._exact.get(branch)
+        if salon_id is not None:
+            return salon_id
+        normalized = normalize_address(branch)
+        salon_id = self._normalized.get(normalized)
+        if salon_id is not None:
+            return salon_id
+        return self._fuzzy(normalized, house_number(branch))
+
+    def name(self, salon_id: int) -> str:
+        """The catalog name (``addressNew``) of ``salon_id``."""
+        return self._names[salon_id]
+
+    def _fuzzy(self, normalized: str, number: str | None) -> int | None:
+        query = trigrams(normalized)
+        if not normalized or not query:
+            return None
+        # Shortlist by rare grams only, then score the shortlist on all grams
+        shared: dict[int, int] = defaultdict(int)
+        for gram in query & self._rare:
+            for position in self._postings[gram]:
+                if number is None or self._numbers[position] == number:
+                    shared[position] += 1
+        shortlist = sorted(shared, key=shared.__getitem__, reverse=True)[:FUZZY_CANDIDATES]
+
+        best_score = second_score = 0.0
+        best = None
+        for position in shortlist:
+            count = len(query & self._grams[position])
+            dice = 2 * count / (len(query) + len(self._grams[position]))
+            containment = count / len(query)
+            score = (dice + containment) / 2
+            if score > best_score:
+                best, best_score, second_score = position, score, best_score
+            elif score > second_score:
+                second_score = score
+
+        if best is None or best_score < MIN_FUZZY_SCORE or best_score - second_score < MIN_SCORE_MARGIN:
+            return None
+        return self._ids[best]
+
+
+def build_branch_index(salons: SalonTable) -> BranchIndex:
+    """Build the branch index for one catalog version."""
+    return BranchIndex(salons)
@@ -0,0 +1,157 @@
+# catalog.py
+# Shared in-process cache of the salon catalog (get_all_salon.json)
+import asyncio
+import contextvars
+import json
+import logging
+import time
+
+import httpx
+
+import upstream
+from config import CATALOG_RETRY_SECONDS, CATALOG_SHARED_TTL_SECONDS, CATALOG_TTL_SECONDS, SALON_CATALOG_URL
+from metrics import STEP_LATENCY, cache_result, span
+from salons import SalonTable, parse_catalog
+from shared_store import SharedStore, shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+class SalonCatalog:
+    """Parsed salon catalog (a ``SalonTable``) shared by every tool.
+
+    Only the very first call waits for the download. Once the data is older
+    than ``ttl`` seconds the stale copy keeps being served while a background
+    task revalidates it with ``If-None-Match`` / ``If-Modified-Since``.
+    ``version`` is bumped every time the content actually changes.
+
+    With a ``shared`` store (multi-worker mode) the last downloaded document
+    and its validators are kept there: a worker starting cold serves that copy
+    right away and revalidates it, so N workers cost one full download.
+    """
+
+    SHARED_KEY = "catalog"
+
+    def __init__(self, url: str, ttl: float, retry_after: float,
+                 shared: SharedStore | None = None, shared_ttl: float = 0):
+        self.url = url
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        self.version = 0
+        self._data: SalonTable | None = None
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+        self._derived: dict[str, tuple[int, object]] = {}
+
+    async def get(self) -> SalonTable:
+        """Return the parsed catalog, downloading it on first use."""
+        data = self._data
+        if data is None:
+            cache_result("catalog", "cold")
+            async with self._lock:
+                if self._data is None and not await self._load_shared():
+                    await self._refresh()
+                data = self._data
+        else:
+            cache_result("catalog", "stale" if time.monotonic() >= self._expires_at else "fresh")
+        # A copy taken over from the shared store starts out stale
+        if time.monotonic() >= self._expires_at:
+            self._refresh_in_background()
+        return data
+
+    async def derived(self, name: str, build):
+        """Return ``build(salons)``, rebuilt only when the catalog version changes.
+
+        Used for indexes over the salon list (spatial index, name lookup...)
+        so they are computed once per catalog version instead of per call.
+        """
+        salons = await self.get()
+        version = self.version
+        cached = self._derived.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with STEP_LATENCY.time(step=f"build_{name}"), span(f"build_{name}"):
+            value = build(salons)
+        self._derived[name] = (version, value)
+        return value
+
+    def _refresh_in_background(self) -> None:
+        # Never wait here: if a refresh is already running, keep serving stale data
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        # Fresh context: the refresh must not be attributed to the tool call that triggered it
+        self._refresh_task = asyncio.get_running_loop().create_task(
+            self._background_refresh(), context=contextvars.Context()
+        )
+
+    async def _background_refresh(self) -> None:
+        try:
+            async with self._lock:
+                await self._refresh()
+        except (httpx.HTTPError, json.JSONDecodeError, KeyError) as exc:
+            # Keep serving the stale copy and try again a little later
+            logger.warning("Salon catalog refresh failed: %s", exc)
+            self._expires_at = time.monotonic() + self.retry_after
+
+    async def _refresh(self) -> None:
+        """Revalidate the catalog; must be called with ``_lock`` held."""
+        headers = {}
+        if self._data is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        response = await upstream.send(self.url, headers=headers)
+        if response.status_code == 304:
+            self._expires_at = time.monotonic() + self.ttl
+            return
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        await self._install(response.content, etag, last_modified)
+        self._expires_at = time.monotonic() + self.ttl
+        if self.shared is not None:
+            validators = json.dumps({"etag": etag, "last_modified": last_modified}).encode()
+            await self.shared.put(self.SHARED_KEY, validators + b"\n" + response.content, self.shared_ttl)
+
+    async def _install(self, content: bytes, etag: str | None, last_modified: str | None) -> None:
+        # Decode off the event loop: the document is several hundred KB
+        with STEP_LATENCY.time(step="catalog_parse"), span("catalog_parse"):
+            data = await asyncio.to_thread(parse_catalog, content)
+
+        self._data = data
+        self._etag = etag
+        self._last_modified = last_modified
+        self.version += 1
+
+    async def _load_shared(self) -> bool:
+        """Install the copy another worker left in the shared store, if any.
+
+        The copy is marked stale so the caller revalidates it in the background.
+        """
+        if self.shared is None:
+            return False
+        stored = await self.shared.get(self.SHARED_KEY)
+        cache_result("catalog_shared", "hit" if stored is not None else "miss")
+        if stored is None:
+            return False
+        validators, _, content = stored.partition(b"\n")
+        try:
+            validators = json.loads(validators)
+            await self._install(content, validators["etag"], validators["last_modified"])
+        except (json.JSONDecodeError, KeyError) as exc:
+            logger.warning("Ignoring unreadable shared salon catalog: %s", exc)
+            return False
+        self._expires_at = 0
+        return True
+
+
+salon_catalog = SalonCatalog(
+    SALON_CATALOG_URL, CATALOG_TTL_SECONDS, CATALOG_RETRY_SECONDS, shared_cache, CATALOG_SHARED_TTL_SECONDS
+)
@@ -1,3 +1,6 @@
+import json
+import os
+
 # City IDs for salon lookup
 CITY_IDS = {
     'Hà Giang': 0,
@@ -29,3 +32,93 @@ BRANCH_HOURS = {
     "Cơ sở Đà Nẵng": {"start": "10:00", "end": "17:00", "interval": 60},
 }
 
+
+# Salon catalog (get_all_salon.json) shared by all tools
+SALON_CATALOG_URL = os.getenv("SALON_CATALOG_URL", "https://storage.30shine.com/web/v3/configs/get_all_salon.json")
+CATALOG_TTL_SECONDS = int(os.getenv("CATALOG_TTL_SECONDS", "300"))
+CATALOG_RETRY_SECONDS = int(os.getenv("CATALOG_RETRY_SECONDS", "30"))
+
+# Upstream APIs (overridable to point the server at a local stand-in, see bench/)
+HERE_GEOCODE_URL = os.getenv("HERE_GEOCODE_URL", "https://geocode.search.hereapi.com/v1/geocode")
+HERE_API_KEY = os.getenv("HERE_API_KEY", "A7V_JCsxV2Y_A_WBg00q_mUB-bDCynwEhwaZeT6QfwY")
+BOOK_HOURS_URL = os.getenv(
+    "BOOK_HOURS_URL",
+    "https://3sgus10dig.execute-api.ap-southeast-1.amazonaws.com/Prod/booking-view-service/api/v1/booking/book-hours-group"
+)
+
+# Shared HTTP client: one keep-alive pool per upstream host
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "5"))
+UPSTREAM_MAX_CONNECTIONS_PER_HOST = int(os.getenv("UPSTREAM_MAX_CONNECTIONS_PER_HOST", "20"))
+UPSTREAM_KEEPALIVE_SECONDS = float(os.getenv("UPSTREAM_KEEPALIVE_SECONDS", "60"))
+
+# Resilience: end-to-end time budget of a tool call, retries of failed GETs,
+# hedged duplicates of slow GETs and per-host circuit breakers
+TOOL_DEADLINE_SECONDS = float(os.getenv("TOOL_DEADLINE_SECONDS", "6"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_RETRY_BACKOFF_SECONDS = float(os.getenv("UPSTREAM_RETRY_BACKOFF_SECONDS", "0.1"))
+# A duplicate is sent once a request is slower than this quantile of recent ones
+UPSTREAM_HEDGE_QUANTILE = float(os.getenv("UPSTREAM_HEDGE_QUANTILE", "0.95"))
+UPSTREAM_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("UPSTREAM_HEDGE_MIN_DELAY_SECONDS", "0.05"))
+UPSTREAM_HEDGE_MIN_SAMPLES = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "10"))
+
+# Admission control per upstream host and worker process: concurrent requests,
+# token bucket rate and burst. Per-host overrides as JSON (keys concurrency,
+# rate, burst and max_wait), e.g.
+# ADMISSION_HOST_LIMITS='{"geocode.search.hereapi.com": {"concurrency": 4, "rate": 5, "burst": 10}}'
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "16"))
+ADMISSION_RATE_PER_SECOND = float(os.getenv("ADMISSION_RATE_PER_SECOND", "50"))
+ADMISSION_BURST = float(os.getenv("ADMISSION_BURST", "50"))
+ADMISSION_HOST_LIMITS = json.loads(os.getenv("ADMISSION_HOST_LIMITS", "{}"))
+# Longest a request may wait for admission; beyond that it is refused as busy
+ADMISSION_MAX_QUEUE_SECONDS = float(os.getenv("ADMISSION_MAX_QUEUE_SECONDS", "1"))
+
+# Local persistent state (geocode cache, appointments)
+DATA_DIR = os.getenv("DATA_DIR", "data")
+
+# Geocode cache: in-memory LRU in front of an SQLite file
+GEOCODE_CACHE_PATH = os.getenv("GEOCODE_CACHE_PATH", os.path.join(DATA_DIR, "geocode_cache.sqlite3"))
+GEOCODE_CACHE_MEMORY_ENTRIES = int(os.getenv("GEOCODE_CACHE_MEMORY_ENTRIES", "10000"))
+GEOCODE_CACHE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+GEOCODE_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("GEOCODE_CACHE_NEGATIVE_TTL_SECONDS", str(24 * 3600)))
+
+# Availability snapshots (book-hours-group) per salon and day
+AVAILABILITY_TTL_SECONDS = float(os.getenv("AVAILABILITY_TTL_SECONDS", "30"))
+# With several workers the snapshots live in the shared cache; each worker keeps
+# its own copy only this long, which bounds how late it sees another worker's booking
+AVAILABILITY_LOCAL_TTL_SECONDS = float(os.getenv("AVAILABILITY_LOCAL_TTL_SECONDS", "2"))
+AVAILABILITY_MAX_ENTRIES = int(os.getenv("AVAILABILITY_MAX_ENTRIES", "5000"))
+# When the booking API fails, an expired snapshot up to this old is served instead
+AVAILABILITY_STALE_SECONDS = float(os.getenv("AVAILABILITY_STALE_SECONDS", "300"))
+
+# Appointments: SQLite database in WAL mode
+APPOINTMENTS_DB_PATH = os.getenv("APPOINTMENTS_DB_PATH", os.path.join(DATA_DIR, "appointments.sqlite3"))
+
+# Multi-worker mode (see main.py): a unique id per worker process, and the
+# cache file shared by all workers of the deployment
+WORKER_ID = os.getenv("WORKER_ID", "")
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join(DATA_DIR, "shared_cache.sqlite3"))
+CATALOG_SHARED_TTL_SECONDS = int(os.getenv("CATALOG_SHARED_TTL_SECONDS", str(24 * 3600)))
+
+# Startup warm-up (see warmup.py): the most requested salons and addresses are
+# persisted and pre-loaded into the availability and geocode caches on start
+HOT_LIST_PATH = os.getenv("HOT_LIST_PATH", os.path.join(DATA_DIR, "hot_list.json"))
+HOT_LIST_SIZE = int(os.getenv("HOT_LIST_SIZE", "100"))
+HOT_LIST_SAVE_SECONDS = float(os.getenv("HOT_LIST_SAVE_SECONDS", "300"))
+WARMUP_PREFILL_SALONS = int(os.getenv("WARMUP_PREFILL_SALONS", "20"))
+WARMUP_TIMEOUT_SECONDS = float(os.getenv("WARMUP_TIMEOUT_SECONDS", "30"))
+
+# Batch availability checks
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# "Earliest free slot near me" search
+EARLIEST_SLOT_MAX_DAYS = int(os.getenv("EARLIEST_SLOT_MAX_DAYS", "7"))
+EARLIEST_SLOT_MAX_SALONS = int(os.getenv("EARLIEST_SLOT_MAX_SALONS", "10"))
+EARLIEST_SLOT_RESULTS = int(os.getenv("EARLIEST_SLOT_RESULTS", "3"))
+# Vietnam has a single time zone (UTC+7) and no daylight saving
+LOCAL_UTC_OFFSET_HOURS = 7
+
+# Observability: fraction of tool calls logged with a per-step trace
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
@@ -0,0 +1,105 @@
+# gazetteer.py
+# Offline lookup of provinces and districts we serve, with centroids and aliases
+import functools
+import json
+import os
+from typing import NamedTuple
+
+from config import CITY_IDS
+from utils import normalize_address
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.json")
+ADMIN_PREFIXES = ("thanh pho ", "tinh ", "thi xa ", "huyen ", "quan ")
+
+
+class Area(NamedTuple):
+    name: str
+    city_id: int
+    lat: float
+    lng: float
+
+
+def area_key(text: str) -> str:
+    """Normalize an area name: "TP. Thủ Đức", "thu duc" -> "thu duc"; "Q.9" -> "quan 9"."""
+    key = normalize_address(text).removesuffix(" city")
+    for prefix in ADMIN_PREFIXES:
+        rest = key.removeprefix(prefix)
+        # "Quận 9" must keep its prefix, "Quận Bình Thạnh" is just "Bình Thạnh"
+        if rest != key and not rest.isdigit():
+            return rest
+    return key
+
+
+class Gazetteer:
+    """Hash maps from normalized names and aliases to province/district areas."""
+
+    def __init__(self, data: dict):
+        self._provinces: dict[str, Area] = {}
+        self._districts: dict[str, list[Area]] = {}
+        province_by_name = {}
+        for entry in data["provinces"]:
+            area = Area(entry["name"], entry["city_id"], entry["lat"], entry["lng"])
+            province_by_name[entry["name"]] = area
+            for name in (entry["name"], *entry["aliases"]):
+                self._provinces[area_key(name)] = area
+        for entry in data["districts"]:
+            province = province_by_name[entry["province"]]
+            area = Area(entry["name"], province.city_id, entry["lat"], entry["lng"])
+            for key in {area_key(name) for name in (entry["name"], *entry["aliases"])}:
+                self._districts.setdefault(key, []).append(area)
+
+    def city_id(self, name: str | None) -> int | None:
+        """Map a city/province name as written by users or the geocoder to its cityId."""
+        if not name:
+            return None
+        if name in CITY_IDS:
+            return CITY_IDS[name]
+        key = area_key(name)
+        province = self._provinces.get(key)
+        if province is not None:
+            return province.city_id
+        district = self._district(key, None)
+        return district.city_id if district is not None else None
+
+    def resolve_area(self, user_address: str, city: str) -> Area | None:
+        """Resolve a query that only names a district and/or city.
+
+        Returns ``None`` as soon as any part of the address is not a known
+        area (e.g. a street or ward), so those still go to the geocoder.
+        """
+        city_key = area_key(city) if city else ""
+        province = self._provinces.get(city_key)
+        city_district = None if province is not None else self._district(city_key, None)
+        if province is None and city_district is None and city_key:
+            return None
+
+        district = None
+        for part in user_address.split(","):
+            key = area_key(part)
+            if not key:
+                continue
+            if key in self._provinces:
+                if province is not None and self._provinces[key] != province:
+                    return None
+                province = self._provinces[key]
+                continue
+            found = self._district(key, province.city_id if province else None)
+            if found is None:
+                return None
+            # Addresses go from specific to general: keep the first district
+            district = district or found
+        return district or city_district or province
+
+    def _district(self, key: str, city_id: int | None) -> Area | None:
+        candidates = [
+            area for area in self._districts.get(key, ())
+            if city_id is None or area.city_id == city_id
+        ]
+        return candidates[0] if len(candidates) == 1 else None
+
+
+@functools.cache
+def get_gazetteer() -> Gazetteer:
+    """Load the bundled gazetteer once per process."""
+    with open(GAZETTEER_PATH, encoding="utf-8") as f:
+        return Gazetteer(json.load(f))
@@ -0,0 +1,158 @@
+# geocode.py
+# HERE geocoding behind a two-tier (memory LRU + SQLite) cache
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import upstream
+from config import (
+    GEOCODE_CACHE_MEMORY_ENTRIES,
+    GEOCODE_CACHE_NEGATIVE_TTL_SECONDS,
+    GEOCODE_CACHE_PATH,
+    GEOCODE_CACHE_TTL_SECONDS,
+    HERE_API_KEY,
+    HERE_GEOCODE_URL,
+)
+from hotlist import hot_list
+from metrics import cache_result
+from utils import normalize_address
+
+_MISSING = object()
+
+
+class GeocodeCache:
+    """Geocode results keyed by normalized address and city.
+
+    Lookups hit an in-memory LRU first and fall back to an SQLite table that
+    survives restarts. Addresses the geocoder could not resolve are cached as
+    ``None`` with a shorter TTL so they do not burn API quota either.
+    """
+
+    def __init__(self, path: str, max_entries: int, ttl: float, negative_ttl: float):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._memory: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(user_address: str, city: str) -> str:
+        # "TP. Hồ Chí Minh", "tp hcm" and "Hồ Chí Minh" all name the same city
+        city_key = normalize_address(city).removeprefix("thanh pho ").removeprefix("tinh ")
+        return f"{normalize_address(user_address)}|{city_key}"
+
+    async def get(self, key: str):
+        """Return the cached value (possibly ``None``) or ``_MISSING``."""
+        tier = "memory"
+        entry = self._memory.get(key)
+        if entry is None:
+            tier = "disk"
+            entry = await asyncio.to_thread(self._db_get, key)
+            if entry is None:
+                cache_result("geocode", "miss")
+                return _MISSING
+            self._remember(key, entry)
+        expires_at, value = entry
+        if expires_at < time.time():
+            self._memory.pop(key, None)
+            cache_result("geocode", "expired")
+            return _MISSING
+        self._memory.move_to_end(key)
+        cache_result("geocode", tier if value is not None else f"{tier}_negative")
+        return value
+
+    async def set(self, key: str, value: dict | None) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        entry = (time.time() + ttl, value)
+        self._remember(key, entry)
+        await asyncio.to_thread(self._db_set, key, entry)
+
+    async def preload(self, keys: list[str]) -> int:
+        """Copy unexpired disk entries for ``keys`` into memory; return how many."""
+        loaded = 0
+        for key in keys:
+            if key in self._memory:
+                continue
+            entry = await asyncio.to_thread(self._db_get, key)
+            if entry is not None and entry[0] >= time.time():
+                self._remember(key, entry)
+                loaded += 1
+        return loaded
+
+    def _remember(self, key: str, entry: tuple[float, dict | None]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, value TEXT, expires_at REAL NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def _db_get(self, key: str) -> tuple[float, dict | None] | None:
+        with self._db_lock:
+            row = self._connect().execute(
+                "SELECT expires_at, value FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1]) if row[1] is not None else None
+
+    def _db_set(self, key: str, entry: tuple[float, dict | None]) -> None:
+        expires_at, value = entry
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO geocode (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False) if value is not None else None, expires_at),
+            )
+            db.commit()
+
+
+geocode_cache = GeocodeCache(
+    GEOCODE_CACHE_PATH,
+    GEOCODE_CACHE_MEMORY_ENTRIES,
+    GEOCODE_CACHE_TTL_SECONDS,
+    GEOCODE_CACHE_NEGATIVE_TTL_SECONDS,
+)
+
+
+async def geocode(user_address: str, city: str) -> dict | None:
+    """Resolve an address to ``{"county", "lat", "lng"}``, or ``None`` if unknown."""
+    key = geocode_cache.make_key(user_address, city)
+    hot_list.record_address(key)
+    cached = await geocode_cache.get(key)
+    if cached is not _MISSING:
+        return cached
+
+    data = await upstream.get_json(
+        HERE_GEOCODE_URL,
+        params={"q": f"{user_address} {city}", "apiKey": HERE_API_KEY, "limit": 1}
+    )
+    items = data.get("items") or []
+    result = None
+    if items:
+        res = items[0]
+        result = {
+            "county": res["address"].get("county"),
+            "lat": res["position"]["lat"],
+            "lng": res["position"]["lng"],
+        }
+    await geocode_cache.set(key, result)
+    return result
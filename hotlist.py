@@ -0,0 +1,98 @@
+# hotlist.py
+# Most requested salons and addresses, persisted so a restart can warm up on them
+import glob
+import json
+import logging
+import os
+from collections import Counter
+
+from config import HOT_LIST_PATH, HOT_LIST_SIZE, WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+
+class HotList:
+    """Request counts per salon id and per geocode key.
+
+    ``save`` writes the top entries to a JSON file; ``load`` reads them back
+    as starting counts, so the ranking carries over across restarts.
+
+    With a ``worker_id`` each worker saves its own counts to its own file
+    (``hot_list.w1.json``...), so workers never overwrite each other. The
+    ranking used for warm-up adds up the files of all workers.
+    """
+
+    def __init__(self, path: str, size: int, worker_id: str = ""):
+        self.size = size
+        self.pattern = None
+        if worker_id:
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{worker_id}{ext}"
+            self.pattern = f"{glob.escape(root)}.*{ext}"
+        self.path = path
+        # Counts of this process (saved to ``path``)...
+        self.salons: Counter[int] = Counter()
+        self.addresses: Counter[str] = Counter()
+        # ...and the other workers' counts as of the last load
+        self._other_salons: Counter[int] = Counter()
+        self._other_addresses: Counter[str] = Counter()
+
+    def record_salon(self, salon_id: int) -> None:
+        self.salons[salon_id] += 1
+
+    def record_address(self, key: str) -> None:
+        self.addresses[key] += 1
+
+    def top_salons(self, n: int) -> list[int]:
+        return [salon_id for salon_id, _ in (self.salons + self._other_salons).most_common(n)]
+
+    def top_addresses(self, n: int) -> list[str]:
+        return [key for key, _ in (self.addresses + self._other_addresses).most_common(n)]
+
+    def load(self) -> None:
+        loaded = self._read(self.path)
+        if loaded is not None:
+            self.salons.update(loaded[0])
+            self.addresses.update(loaded[1])
+        if self.pattern is None:
+            return
+        for path in glob.glob(self.pattern):
+            if path == self.path:
+                continue
+            loaded = self._read(path)
+            if loaded is not None:
+                self._other_salons.update(loaded[0])
+                self._other_addresses.update(loaded[1])
+
+    def _read(self, path: str) -> tuple[Counter[int], Counter[str]] | None:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            salons = Counter({int(salon_id): count for salon_id, count in data["salons"]})
+            addresses = Counter(dict(data["addresses"]))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            logger.warning("Ignoring unreadable hot list %s: %s", path, exc)
+            return None
+        return salons, addresses
+
+    def save(self) -> None:
+        data = {
+            "salons": self.salons.most_common(self.size),
+            "addresses": self.addresses.most_common(self.size),
+        }
+        # Keep memory bounded: the long tail of one-off addresses never makes the list
+        self.salons = Counter(dict(self.salons.most_common(self.size * 10)))
+        self.addresses = Counter(dict(self.addresses.most_common(self.size * 10)))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Write then rename, so a crash never leaves half a file
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temporary, self.path)
+
+
+hot_list = HotList(HOT_LIST_PATH, HOT_LIST_SIZE, WORKER_ID)
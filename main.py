@@ -1,4 +1,110 @@
+"""Run the MCP server over SSE.
+
+    python main.py                  # one process on FASTMCP_PORT (default 8000)
+    python main.py --port 9000      # one process on port 9000
+    python main.py --workers 4      # four worker processes on ports 8001-8004
+
+Every process warms up at start (upstream connections, salon catalog and
+indexes, hot geocode and availability entries, see warmup.py) and answers
+``GET /ready`` with 503 until that is done: use it as the readiness probe.
+
+Scale-out mode
+--------------
+An SSE session lives in the process that opened the stream: the client
+later POSTs its messages to the path announced in the stream's ``endpoint``
+event. Each worker therefore gets an id (``WORKER_ID``, e.g. ``w1``) and
+announces ``/<id>/messages/`` instead of ``/messages/``. A load balancer
+spreads new ``/sse`` streams over all workers and routes ``/<id>/...``
+to that worker, e.g. with nginx:
+
+    upstream mcp_workers { least_conn; server 127.0.0.1:8001; server 127.0.0.1:8002; }
+    location /sse { proxy_pass http://mcp_workers; proxy_buffering off; proxy_read_timeout 1h; }
+    location /w1/ { proxy_pass http://127.0.0.1:8001; }
+    location /w2/ { proxy_pass http://127.0.0.1:8002; }
+
+Worker ids must be unique across hosts (``--worker-prefix web1-w``).
+Workers share appointments, the geocode cache and the catalog/availability
+caches through the SQLite files in ``DATA_DIR``, so every worker of a
+deployment must see the same ``DATA_DIR``.
+
+Upstream admission limits (``ADMISSION_*`` in config.py) apply per
+process: divide the quota agreed with an upstream by the number of workers.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
 from tools import mcp
+from warmup import lifespan
+
+# uvicorn waits for open SSE streams on shutdown; cut them off after this
+GRACEFUL_SHUTDOWN_SECONDS = 5
+WORKER_STOP_TIMEOUT_SECONDS = 10
+
+
+def serve() -> None:
+    """Serve the SSE app; it warms up in the background and reports it on /ready."""
+    app = Starlette(routes=[Mount("/", app=mcp.sse_app())], lifespan=lifespan)
+    uvicorn.run(
+        app,
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+    )
+
+
+def run_workers(count: int, base_port: int, prefix: str) -> None:
+    """Start ``count`` workers and stop them all when this process is told to stop."""
+    # Spawned workers import tools afresh, reading their settings from the
+    # environment they are started with
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for i in range(1, count + 1):
+        os.environ["WORKER_ID"] = f"{prefix}{i}"
+        os.environ["FASTMCP_PORT"] = str(base_port + i)
+        worker = context.Process(target=serve, name=f"{prefix}{i}")
+        worker.start()
+        workers.append(worker)
+
+    def stop(signum, frame):
+        for worker in workers:
+            worker.terminate()
+        deadline = time.monotonic() + WORKER_STOP_TIMEOUT_SECONDS
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                # uvicorn keeps waiting for open SSE streams on shutdown
+                worker.kill()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in workers:
+        worker.join()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "1")),
+                        help="number of worker processes (default 1: a single plain server)")
+    parser.add_argument("--port", type=int, default=int(os.getenv("FASTMCP_PORT", "8000")),
+                        help="port of the single server; with --workers, worker i listens on port + i")
+    parser.add_argument("--worker-prefix", default=os.getenv("WORKER_PREFIX", "w"),
+                        help="worker ids are <prefix>1..<prefix>N")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        run_workers(args.workers, args.port, args.worker_prefix)
+    else:
+        mcp.settings.port = args.port
+        serve()
+
 
 if __name__ == "__main__":
-    mcp.run(transport="sse")
\ No newline at end of file
+    main()
@@ -0,0 +1,243 @@
+# metrics.py
+# In-process metrics (Prometheus text format) and sampled trace spans
+import contextvars
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+import httpx
+from starlette.requests import Request
+from starlette.responses import Response
+
+from config import TRACE_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: dict[tuple[str, ...], object] = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _format_labels(self, key: tuple[str, ...], extra: str = "") -> str:
+        parts = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self._values.items()):
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value) -> list[str]:
+        return [f"{self.name}{self._format_labels(key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in flight."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_value(self, key, state) -> list[str]:
+        counts, total, count = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = f'le="{bound}"'
+            lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{self._format_labels(key, le)} {count}")
+        lines.append(f"{self.name}_sum{self._format_labels(key)} {total}")
+        lines.append(f"{self.name}_count{self._format_labels(key)} {count}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY: list[_Metric] = []
+
+TOOL_LATENCY = Histogram("mcp_tool_duration_seconds", "MCP tool call latency.", ("tool",))
+TOOL_IN_FLIGHT = Gauge("mcp_tool_in_flight", "MCP tool calls currently running.", ("tool",))
+TOOL_ERRORS = Counter("mcp_tool_errors_total", "Tool failures by category.", ("tool", "category"))
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Upstream HTTP request latency.", ("upstream", "status")
+)
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Upstream HTTP requests in flight.", ("upstream",))
+UPSTREAM_RETRIES = Counter("upstream_retries_total", "Upstream requests retried after a failure.", ("upstream",))
+UPSTREAM_HEDGES = Counter(
+    "upstream_hedges_total", "Duplicate requests sent after the hedging delay, by winner.", ("upstream", "winner")
+)
+ADMISSION_QUEUED = Gauge("admission_queued_requests", "Upstream requests waiting for admission.", ("upstream",))
+ADMISSION_WAIT = Histogram("admission_wait_seconds", "Time queued before an upstream request started.", ("upstream",))
+ADMISSION_SHED = Counter(
+    "admission_shed_total", "Upstream requests refused because their deadline could not be met.", ("upstream", "reason")
+)
+BREAKER_STATE = Gauge("upstream_circuit_state", "Circuit breaker state (0 closed, 1 open, 2 half open).", ("upstream",))
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result.", ("cache", "result"))
+STEP_LATENCY = Histogram("internal_step_duration_seconds", "Time spent in local processing steps.", ("step",))
+
+_current_tool: contextvars.ContextVar[str] = contextvars.ContextVar("current_tool", default="")
+_current_trace: contextvars.ContextVar[list | None] = contextvars.ContextVar("current_trace", default=None)
+
+
+def current_tool() -> str:
+    return _current_tool.get()
+
+
+def cache_result(cache: str, result: str) -> None:
+    """Count one cache lookup (e.g. ``cache_result("geocode", "memory")``)."""
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+
+
+def record_error(category: str) -> None:
+    """Count a failure of the current tool under ``category``."""
+    TOOL_ERRORS.inc(tool=current_tool() or "unknown", category=category)
+
+
+def error_category(exc: BaseException) -> str:
+    """Classify a failure so apologies can be told apart on dashboards."""
+    category = getattr(exc, "category", None)
+    if category:
+        return category
+    if isinstance(exc, httpx.TimeoutException):
+        return "upstream_timeout"
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"upstream_http_{exc.response.status_code // 100}xx"
+    if isinstance(exc, httpx.HTTPError):
+        return "upstream_connection"
+    if isinstance(exc, json.JSONDecodeError):
+        return "upstream_invalid_json"
+    if isinstance(exc, (KeyError, IndexError, TypeError)):
+        return "upstream_unexpected_payload"
+    return type(exc).__name__
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a step; recorded in the current trace when the call is sampled."""
+    trace = _current_trace.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            trace.append({
+                "span": name,
+                "start_ms": round((started - trace[0]["_t0"]) * 1000, 2),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                **attributes,
+            })
+
+
+def instrument_tool(fn):
+    """Time an async MCP tool, track it as in flight and maybe trace it."""
+    tool = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        tool_token = _current_tool.set(tool)
+        trace = [{"_t0": time.perf_counter()}] if random.random() < TRACE_SAMPLE_RATE else None
+        trace_token = _current_trace.set(trace)
+        started = time.perf_counter()
+        try:
+            with TOOL_IN_FLIGHT.track(tool=tool):
+                return await fn(*args, **kwargs)
+        except Exception as exc:
+            record_error(error_category(exc))
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            TOOL_LATENCY.observe(elapsed, tool=tool)
+            if trace is not None:
+                logger.info("trace %s", json.dumps({
+                    "tool": tool, "duration_ms": round(elapsed * 1000, 2), "spans": trace[1:]
+                }, ensure_ascii=False))
+            _current_trace.reset(trace_token)
+            _current_tool.reset(tool_token)
+
+    return wrapper
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,148 @@
+# resilience.py
+# Deadlines, latency tracking and circuit breakers for upstream calls
+import contextvars
+import functools
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import httpx
+
+from config import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+    UPSTREAM_HEDGE_MIN_DELAY_SECONDS,
+    UPSTREAM_HEDGE_MIN_SAMPLES,
+    UPSTREAM_HEDGE_QUANTILE,
+)
+from metrics import BREAKER_STATE
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The tool call ran out of time budget before an upstream call could start."""
+    category = "deadline_exceeded"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """The upstream host is failing; the call was refused without being sent."""
+    category = "upstream_circuit_open"
+
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Give the enclosed block at most ``seconds``, within any enclosing budget."""
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def with_deadline(seconds: float):
+    """Run an async function under an end-to-end ``deadline``."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with deadline(seconds):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def remaining() -> float | None:
+    """Seconds left in the current budget, or ``None`` when there is none."""
+    expires_at = _deadline.get()
+    return None if expires_at is None else expires_at - time.monotonic()
+
+
+class LatencyTracker:
+    """Recent successful response times of one host, for the hedging delay."""
+
+    def __init__(self, size: int = 256):
+        self._recent: deque[float] = deque(maxlen=size)
+
+    def record(self, seconds: float) -> None:
+        self._recent.append(seconds)
+
+    def hedge_delay(self) -> float | None:
+        """How long to wait before a duplicate request, or ``None`` if too few samples."""
+        if len(self._recent) < UPSTREAM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._recent)
+        quantile = ordered[min(len(ordered) - 1, int(len(ordered) * UPSTREAM_HEDGE_QUANTILE))]
+        return max(quantile, UPSTREAM_HEDGE_MIN_DELAY_SECONDS)
+
+
+class CircuitBreaker:
+    """Per-host breaker: closed -> open after consecutive failures -> half open.
+
+    While open every call is refused at once. After ``reset_after`` seconds a
+    single trial call is let through; its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 0, 1, 2
+
+    def __init__(self, host: str, threshold: int, reset_after: float):
+        self.host = host
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_after:
+                return False
+            self._set_state(self.HALF_OPEN)
+        if self._trial_running:
+            return False
+        self._trial_running = True
+        return True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._trial_running = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+
+    def abandon(self) -> None:
+        """The call let through by ``allow`` was cancelled before finishing."""
+        self._trial_running = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_running = False
+        if self.state == self.HALF_OPEN or self._failures >= self.threshold:
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def _set_state(self, state: int) -> None:
+        self.state = state
+        BREAKER_STATE.set(state, upstream=self.host)
+
+
+_trackers: dict[str, LatencyTracker] = {}
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_tracker(host: str) -> LatencyTracker:
+    tracker = _trackers.get(host)
+    if tracker is None:
+        tracker = _trackers[host] = LatencyTracker()
+    return tracker
+
+
+def get_breaker(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS)
+    return breaker
@@ -0,0 +1,137 @@
+# salons.py
+# Compact columnar form of the salon catalog (get_all_salon.json)
+import json
+import math
+from array import array
+from typing import Iterator, NamedTuple
+
+# Only these fields of each salon are used; everything else is dropped while parsing
+SALON_FIELDS = ("id", "cityId", "latitude", "longitude", "addressNew")
+NO_CITY = -1
+# Value ranges of the typed id columns
+ID_RANGE = range(-2 ** 63, 2 ** 63)
+CITY_ID_RANGE = range(-2 ** (8 * array("i").itemsize - 1), 2 ** (8 * array("i").itemsize - 1))
+
+
+class Salon(NamedTuple):
+    id: int
+    city_id: int | None
+    latitude: float
+    longitude: float
+    address: str
+
+
+class SalonTable:
+    """Salons stored column by column.
+
+    Ids, city ids and coordinates live in typed arrays (8 bytes per value
+    instead of a boxed Python object in a dict per salon), addresses in a
+    list of strings. ``count`` is the branch count announced by the document.
+    Missing coordinates are NaN, a missing city id is ``None`` on rows.
+    """
+
+    def __init__(self, count: int = 0):
+        self.count = count
+        self.ids = array("q")
+        self.city_ids = array("i")
+        self.latitudes = array("d")
+        self.longitudes = array("d")
+        self.addresses: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, position: int) -> Salon:
+        city_id = self.city_ids[position]
+        return Salon(
+            self.ids[position],
+            None if city_id == NO_CITY else city_id,
+            self.latitudes[position],
+            self.longitudes[position],
+            self.addresses[position],
+        )
+
+    def __iter__(self) -> Iterator[Salon]:
+        return (self[position] for position in range(len(self)))
+
+    def append(self, salon_id, city_id, latitude, longitude, address) -> None:
+        """Add one salon; raises ``ValueError`` or ``TypeError`` for an unusable id."""
+        # Convert and range-check everything first so a bad value cannot
+        # leave the columns misaligned
+        values = (
+            _integer(salon_id, ID_RANGE),
+            NO_CITY if city_id is None else _integer(city_id, CITY_ID_RANGE),
+            _coordinate(latitude),
+            _coordinate(longitude),
+            str(address or ""),
+        )
+        self.ids.append(values[0])
+        self.city_ids.append(values[1])
+        self.latitudes.append(values[2])
+        self.longitudes.append(values[3])
+        self.addresses.append(values[4])
+
+
+def _integer(value, valid: range) -> int:
+    try:
+        number = int(value)
+    except OverflowError as exc:  # int(float("inf"))
+        raise ValueError(f"not a finite number: {value!r}") from exc
+    if number not in valid:
+        raise ValueError(f"out of range: {value!r}")
+    return number
+
+
+def _coordinate(value) -> float:
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def _slim(obj: dict):
+    """``object_hook``: shrink each salon object to the tuple of fields we keep.
+
+    Runs as soon as an object is decoded, so the full salon dicts (images,
+    phone, opening hours...) never pile up for the whole document.
+    """
+    if "id" in obj and ("addressNew" in obj or "latitude" in obj):
+        return tuple(obj.get(field) for field in SALON_FIELDS)
+    return obj
+
+
+class CatalogFormatError(KeyError):
+    """The catalog document does not have the expected shape.
+
+    A ``KeyError`` so the handlers for unexpected upstream payloads catch it.
+    """
+
+
+def parse_catalog(content: bytes) -> SalonTable:
+    """Parse the raw (possibly BOM-prefixed) document into a ``SalonTable``.
+
+    ``json.loads`` takes the bytes directly and detects UTF-8 with or without
+    a BOM itself. Raises ``json.JSONDecodeError`` for invalid JSON and
+    ``CatalogFormatError`` for any other malformed document.
+    """
+    try:
+        document = json.loads(content, object_hook=_slim)
+    except UnicodeDecodeError as exc:
+        raise CatalogFormatError(f"catalog is not UTF-8: {exc}") from exc
+    rows = document.get("data") if isinstance(document, dict) else None
+    if not isinstance(rows, list):
+        raise CatalogFormatError("catalog has no salon list")
+    count = document.get("count")
+    try:
+        table = SalonTable(len(rows) if count is None else int(count))
+    except (TypeError, ValueError, OverflowError) as exc:
+        raise CatalogFormatError(f"invalid salon count {count!r}") from exc
+    for row in rows:
+        if isinstance(row, dict):
+            row = tuple(row.get(field) for field in SALON_FIELDS)
+        try:
+            table.append(*row)
+        except (TypeError, ValueError):
+            continue  # salon without a usable id
+    return table
@@ -0,0 +1,79 @@
+# shared_store.py
+# Expiring cache entries shared by every worker process (SQLite)
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from config import SHARED_CACHE_PATH, WORKER_ID
+
+
+class SharedStore:
+    """Key/value entries with an expiry time in an SQLite database in WAL mode.
+
+    Every worker of a deployment opens the same file, so an upstream answer
+    fetched by one worker is reused by the others, and a ``delete`` after a
+    booking is seen by all of them.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value FROM entries WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _put(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            db = self._connect()
+            # Expired rows are only ever overwritten; purge them now and then
+            if random.random() < 0.01:
+                db.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            db.commit()
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            db = self._connect()
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            db.commit()
+
+    async def get(self, key: str) -> bytes | None:
+        """Return the value stored under ``key``, or ``None`` if absent or expired."""
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, value: bytes, ttl: float) -> None:
+        """Store ``value`` under ``key`` for ``ttl`` seconds."""
+        await asyncio.to_thread(self._put, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+
+# Only worker processes of a multi-worker deployment share their caches
+shared_cache = SharedStore(SHARED_CACHE_PATH) if WORKER_ID else None
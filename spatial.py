@@ -0,0 +1,112 @@
+# spatial.py
+# Grid index over salon coordinates for nearest-salon queries
+import heapq
+import math
+from collections import defaultdict
+
+from salons import Salon, SalonTable
+from utils import EARTH_RADIUS_KM, haversine_distance
+
+# ~5.5 km per cell: a handful of salons per cell in dense districts
+DEFAULT_CELL_DEGREES = 0.05
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class SalonSpatialIndex:
+    """Uniform lat/lon grid over the salons, one grid per city plus a global one.
+
+    ``nearest`` walks rings of cells outwards from the query point and stops
+    as soon as no unvisited cell can hold anything closer than the current
+    k-th best, so a query only touches the cells around the user instead of
+    every salon in the city.
+    """
+
+    def __init__(self, salons: SalonTable, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._salons = salons
+        self._size = 0
+        self._global = defaultdict(list)
+        self._by_city = defaultdict(lambda: defaultdict(list))
+        # Grid cells hold row positions into the table's coordinate columns
+        columns = zip(salons.latitudes, salons.longitudes, salons.city_ids)
+        for position, (lat, lon, city_id) in enumerate(columns):
+            if math.isnan(lat) or math.isnan(lon):
+                continue
+            self._size += 1
+            cell = self._cell(lat, lon)
+            self._global[cell].append(position)
+            self._by_city[city_id][cell].append(position)
+        self._extent = {
+            city_id: self._grid_extent(grid) for city_id, grid in self._by_city.items()
+        }
+        self._extent[None] = self._grid_extent(self._global)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def nearest(
+            self, lat: float, lon: float, k: int = 5, city_id: int | None = None
+    ) -> list[tuple[float, Salon]]:
+        """Return up to ``k`` ``(distance_km, salon)`` pairs, closest first.
+
+        With ``city_id=None`` salons of every city are considered, which lets
+        users near a province border see salons on the other side.
+        """
+        grid = self._global if city_id is None else self._by_city.get(city_id)
+        if not grid or k <= 0:
+            return []
+
+        ci, cj = self._cell(lat, lon)
+        max_ring = self._ring_bound(ci, cj, self._extent[city_id])
+        # Conservative km per cell in the longitude direction near the query
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + self.cell_degrees)))
+        cell_km = self.cell_degrees * KM_PER_DEGREE * cos_lat
+
+        latitudes, longitudes = self._salons.latitudes, self._salons.longitudes
+        best = []  # max-heap of (-distance, position)
+        for ring in range(max_ring + 1):
+            if len(best) == k and (ring - 1) * cell_km > -best[0][0]:
+                break
+            for cell in self._ring_cells(ci, cj, ring):
+                for position in grid.get(cell, ()):
+                    distance = haversine_distance(lat, lon, latitudes[position], longitudes[position])
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, position))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, position))
+
+        return [(-d, self._salons[p]) for d, p in sorted(best, reverse=True)]
+
+    def _cell(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    @staticmethod
+    def _grid_extent(grid) -> tuple[int, int, int, int]:
+        if not grid:
+            return 0, 0, 0, 0
+        rows = [cell[0] for cell in grid]
+        cols = [cell[1] for cell in grid]
+        return min(rows), max(rows), min(cols), max(cols)
+
+    @staticmethod
+    def _ring_bound(ci: int, cj: int, extent: tuple[int, int, int, int]) -> int:
+        """Ring number beyond which the grid has no cells at all."""
+        min_i, max_i, min_j, max_j = extent
+        return max(abs(ci - min_i), abs(ci - max_i), abs(cj - min_j), abs(cj - max_j))
+
+    @staticmethod
+    def _ring_cells(ci: int, cj: int, ring: int):
+        if ring == 0:
+            yield ci, cj
+            return
+        for j in range(cj - ring, cj + ring + 1):
+            yield ci - ring, j
+            yield ci + ring, j
+        for i in range(ci - ring + 1, ci + ring):
+            yield i, cj - ring
+            yield i, cj + ring
+
+
+def build_spatial_index(salons: SalonTable) -> SalonSpatialIndex:
+    """Build the spatial index for one catalog version."""
+    return SalonSpatialIndex(salons)
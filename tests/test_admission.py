@@ -0,0 +1,115 @@
+# test_admission.py
+# HostScheduler: round-robin fairness, load shedding, withdrawal of granted slots
+import asyncio
+import unittest
+
+from admission import HostScheduler, Overloaded
+from resilience import deadline
+
+
+async def settle() -> None:
+    """Let woken waiters run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class HostSchedulerTest(unittest.IsolatedAsyncioTestCase):
+
+    def scheduler(self, concurrency=1, rate=1000.0, burst=100.0, max_wait=10.0) -> HostScheduler:
+        return HostScheduler("upstream.test", concurrency, rate, burst, max_wait)
+
+    async def test_sessions_are_served_round_robin(self):
+        scheduler = self.scheduler()
+        self.assertTrue(scheduler.try_acquire())
+        order = []
+
+        async def request(key, name):
+            await scheduler.acquire(key)
+            order.append(name)
+
+        tasks = [asyncio.create_task(request(key, name))
+                 for key, name in (("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"))]
+        await settle()
+        for _ in tasks:
+            scheduler.release(0.1)
+            await settle()
+        await asyncio.gather(*tasks)
+        # The busy session does not delay the other one behind all of its requests
+        self.assertEqual(order, ["a1", "b1", "a2", "a3"])
+
+    async def test_try_acquire_does_not_jump_the_queue(self):
+        scheduler = self.scheduler()
+        self.assertTrue(scheduler.try_acquire())
+        waiter = asyncio.create_task(scheduler.acquire("a"))
+        await settle()
+        scheduler.max_concurrency = 2
+        self.assertFalse(scheduler.try_acquire())
+        scheduler.release(0.1)
+        await waiter
+
+    async def test_predicted_wait_beyond_max_wait_is_shed_at_once(self):
+        scheduler = self.scheduler(max_wait=0.05)
+        self.assertTrue(scheduler.try_acquire())
+        with self.assertRaises(Overloaded):
+            await scheduler.acquire("a")
+        self.assertEqual(scheduler._waiting, 0)
+
+    async def test_request_without_budget_left_is_shed(self):
+        scheduler = self.scheduler()
+        self.assertTrue(scheduler.try_acquire())
+        with deadline(0.05), self.assertRaises(Overloaded):
+            await scheduler.acquire("a")
+
+    async def test_request_still_queued_after_max_wait_is_shed(self):
+        scheduler = self.scheduler(max_wait=0.2)
+        self.assertTrue(scheduler.try_acquire())
+        with self.assertRaises(Overloaded):
+            await scheduler.acquire("a")
+        self.assertEqual(scheduler._waiting, 0)
+        self.assertFalse(scheduler._queues)
+        self.assertEqual(scheduler.active, 1)
+
+    async def test_waits_for_the_next_token(self):
+        scheduler = self.scheduler(concurrency=10, rate=20.0, burst=1.0)
+        self.assertTrue(scheduler.try_acquire())
+        self.assertFalse(scheduler.try_acquire())
+        await asyncio.wait_for(scheduler.acquire("a"), 1)
+        self.assertEqual(scheduler.active, 2)
+
+    async def test_cancelled_while_queued_leaves_the_queue(self):
+        scheduler = self.scheduler()
+        self.assertTrue(scheduler.try_acquire())
+        waiter = asyncio.create_task(scheduler.acquire("a"))
+        await settle()
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(scheduler._waiting, 0)
+        self.assertFalse(scheduler._queues)
+        self.assertEqual(scheduler.active, 1)
+
+    async def test_cancelled_after_grant_gives_the_slot_back(self):
+        scheduler = self.scheduler()
+        self.assertTrue(scheduler.try_acquire())
+        waiter = asyncio.create_task(scheduler.acquire("a"))
+        await settle()
+        # The slot is handed over, but the waiter is cancelled before it resumes
+        scheduler.release(0.1)
+        self.assertEqual(scheduler.active, 1)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(scheduler.active, 0)
+        self.assertTrue(scheduler.try_acquire())
+
+    async def test_slot_releases_on_error(self):
+        scheduler = self.scheduler()
+        with self.assertRaises(RuntimeError):
+            async with scheduler.slot():
+                self.assertEqual(scheduler.active, 1)
+                raise RuntimeError("upstream failed")
+        self.assertEqual(scheduler.active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# test_branches.py
+# BranchIndex lookups: exact, normalized, fuzzy, and the house-number rule
+import unittest
+
+from branches import BranchIndex, house_number
+from salons import SalonTable
+
+ADDRESSES = {
+    1: "82 Trần Đại Nghĩa, P. Bách Khoa, Q. Hai Bà Trưng, Hà Nội",
+    2: "45/3 Nguyễn Trãi, P. Thượng Đình, Q. Thanh Xuân, Hà Nội",
+    3: "12A Lê Lợi, P. Bến Nghé, Q. 1, TP. Hồ Chí Minh",
+    4: "107 Phố Huế, Q. Hai Bà Trưng, Hà Nội",
+    5: "109 Phố Huế, Q. Hai Bà Trưng, Hà Nội",
+}
+
+
+def branch_index(addresses: dict[int, str] = ADDRESSES) -> BranchIndex:
+    table = SalonTable()
+    for salon_id, address in addresses.items():
+        table.append(salon_id, 1, 21.0, 105.8, address)
+    return BranchIndex(table)
+
+
+class HouseNumberTest(unittest.TestCase):
+
+    def test_reads_the_leading_number(self):
+        self.assertEqual(house_number("82 Trần Đại Nghĩa"), "82")
+        self.assertEqual(house_number("Số 12A Lê Lợi"), "12a")
+        self.assertEqual(house_number("45 / 3 Nguyễn Trãi"), "45/3")
+
+    def test_no_number(self):
+        self.assertIsNone(house_number("Trần Đại Nghĩa"))
+        self.assertIsNone(house_number(""))
+
+
+class BranchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = branch_index()
+
+    def test_exact_name(self):
+        self.assertEqual(self.index.resolve(ADDRESSES[2]), 2)
+        self.assertEqual(self.index.name(2), ADDRESSES[2])
+
+    def test_without_diacritics_and_abbreviations(self):
+        self.assertEqual(self.index.resolve("82 tran dai nghia, phuong bach khoa, quan hai ba trung, ha noi"), 1)
+
+    def test_typos_and_partial_names(self):
+        self.assertEqual(self.index.resolve("82 Tran Dai Ngia, Hai Ba Trung"), 1)
+        self.assertEqual(self.index.resolve("45/3 Nguyen Trai"), 2)
+        self.assertEqual(self.index.resolve("12A Le Loi, Ben Nghe"), 3)
+
+    def test_never_changes_the_house_number(self):
+        self.assertIsNone(self.index.resolve("28 Tran Dai Nghia, Hai Ba Trung"))
+        self.assertIsNone(self.index.resolve("45/9 Nguyen Trai"))
+        self.assertIsNone(self.index.resolve("12 Le Loi"))
+
+    def test_number_picks_between_near_identical_names(self):
+        self.assertEqual(self.index.resolve("107 Pho Hue"), 4)
+        self.assertEqual(self.index.resolve("109 Pho Hue"), 5)
+
+    def test_ambiguous_query_is_refused(self):
+        self.assertIsNone(self.index.resolve("Pho Hue, Hai Ba Trung"))
+
+    def test_unrelated_or_empty_query(self):
+        self.assertIsNone(self.index.resolve("Vincom Bà Triệu"))
+        self.assertIsNone(self.index.resolve(""))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# test_resilience.py
+# CircuitBreaker state machine and deadline budgets
+import time
+import unittest
+
+from resilience import CircuitBreaker, deadline, remaining
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def breaker(self, threshold=3, reset_after=60.0) -> CircuitBreaker:
+        return CircuitBreaker("upstream.test", threshold, reset_after)
+
+    def open_and_expire(self, breaker: CircuitBreaker) -> None:
+        for _ in range(breaker.threshold):
+            breaker.record_failure()
+        breaker._opened_at = time.monotonic() - breaker.reset_after
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = self.breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_the_failure_count(self):
+        breaker = self.breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_lets_one_trial_through_after_reset_time(self):
+        breaker = self.breaker()
+        self.open_and_expire(breaker)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_successful_trial_closes(self):
+        breaker = self.breaker()
+        self.open_and_expire(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_failed_trial_reopens(self):
+        breaker = self.breaker()
+        self.open_and_expire(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_abandoned_trial_lets_the_next_call_try(self):
+        breaker = self.breaker()
+        self.open_and_expire(breaker)
+        self.assertTrue(breaker.allow())
+        breaker.abandon()
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+
+class DeadlineTest(unittest.TestCase):
+
+    def test_no_budget_outside_a_deadline(self):
+        self.assertIsNone(remaining())
+
+    def test_inner_deadline_cannot_extend_the_outer_one(self):
+        with deadline(0.5):
+            with deadline(10):
+                self.assertLessEqual(remaining(), 0.5)
+            with deadline(0.1):
+                self.assertLessEqual(remaining(), 0.1)
+        self.assertIsNone(remaining())
+
+
+if __name__ == "__main__":
+    unittest.main()
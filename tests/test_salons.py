@@ -0,0 +1,96 @@
+# test_salons.py
+# parse_catalog on well-formed and malformed catalog documents
+import json
+import math
+import unittest
+
+from salons import CatalogFormatError, SalonTable, parse_catalog
+
+
+def document(rows, count=None) -> bytes:
+    body = {"data": rows} if count is None else {"count": count, "data": rows}
+    return json.dumps(body, ensure_ascii=False).encode()
+
+
+def salon(salon_id=1, city_id=2, latitude=21.0, longitude=105.8, address="82 Trần Đại Nghĩa"):
+    return {"id": salon_id, "cityId": city_id, "latitude": latitude, "longitude": longitude,
+            "addressNew": address, "phone": "1900", "images": ["a.jpg"]}
+
+
+class ParseCatalogTest(unittest.TestCase):
+
+    def test_keeps_only_the_used_fields(self):
+        table = parse_catalog(document([salon(), salon(2, None, "21.5", None, None)], count=7))
+        self.assertEqual(table.count, 7)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(tuple(table[0]), (1, 2, 21.0, 105.8, "82 Trần Đại Nghĩa"))
+        second = table[1]
+        self.assertIsNone(second.city_id)
+        self.assertEqual(second.latitude, 21.5)
+        self.assertTrue(math.isnan(second.longitude))
+        self.assertEqual(second.address, "")
+
+    def test_count_defaults_to_the_number_of_rows(self):
+        self.assertEqual(parse_catalog(document([salon()])).count, 1)
+
+    def test_utf8_bom(self):
+        table = parse_catalog(b"\xef\xbb\xbf" + document([salon()]))
+        self.assertEqual(table[0].address, "82 Trần Đại Nghĩa")
+
+    def test_invalid_json(self):
+        for content in (b"", b"{", b'{"data": [}'):
+            with self.subTest(content=content), self.assertRaises(json.JSONDecodeError):
+                parse_catalog(content)
+
+    def test_not_utf8(self):
+        with self.assertRaises(CatalogFormatError):
+            parse_catalog('{"data": [], "x": "Hà Noi"}'.encode("latin-1"))
+
+    def test_wrong_shape(self):
+        for content in (b"[]", b"null", b"42", b'{"data": null}', b'{"data": {"id": 1}}', b"{}"):
+            with self.subTest(content=content), self.assertRaises(CatalogFormatError):
+                parse_catalog(content)
+
+    def test_invalid_count(self):
+        for count in ("many", [], float("inf")):
+            with self.subTest(count=count), self.assertRaises(CatalogFormatError):
+                parse_catalog(document([salon()], count=count))
+
+    def test_format_error_is_a_key_error(self):
+        with self.assertRaises(KeyError):
+            parse_catalog(b"{}")
+
+    def test_rows_without_a_usable_id_are_skipped(self):
+        rows = [
+            salon(None), salon("abc"), salon(2 ** 63), salon(float("inf")),
+            salon(3, city_id=2 ** 31), salon(4, city_id="x"), 17, "salon", None,
+            salon(5),
+        ]
+        table = parse_catalog(document(rows))
+        self.assertEqual(list(table.ids), [5])
+        # Columns stay aligned after skipped rows
+        self.assertEqual(len(table.city_ids), 1)
+        self.assertEqual(len(table.latitudes), 1)
+        self.assertEqual(len(table.addresses), 1)
+
+    def test_non_finite_coordinates_become_nan(self):
+        content = b'{"data": [{"id": 1, "latitude": Infinity, "longitude": NaN, "addressNew": "x"}]}'
+        table = parse_catalog(content)
+        self.assertTrue(math.isnan(table[0].latitude))
+        self.assertTrue(math.isnan(table[0].longitude))
+
+
+class SalonTableTest(unittest.TestCase):
+
+    def test_append_rejects_bad_ids_without_misaligning_columns(self):
+        table = SalonTable()
+        with self.assertRaises(ValueError):
+            table.append(2 ** 63, 1, 21.0, 105.8, "x")
+        with self.assertRaises(TypeError):
+            table.append(None, 1, 21.0, 105.8, "x")
+        self.assertEqual(len(table), 0)
+        self.assertEqual(len(table.addresses), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
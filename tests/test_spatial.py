@@ -0,0 +1,71 @@
+# test_spatial.py
+# SalonSpatialIndex against a brute-force ranking over every salon
+import math
+import random
+import unittest
+
+from salons import SalonTable
+from spatial import SalonSpatialIndex
+from utils import haversine_distance
+
+
+def brute_force(table: SalonTable, lat: float, lon: float, k: int, city_id=None) -> list[tuple[float, int]]:
+    ranked = sorted(
+        (haversine_distance(lat, lon, salon.latitude, salon.longitude), salon.id)
+        for salon in table
+        if not math.isnan(salon.latitude) and (city_id is None or salon.city_id == city_id)
+    )
+    return ranked[:k]
+
+
+class SalonSpatialIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(30)
+        self.table = SalonTable()
+        for salon_id in range(400):
+            # Two dense cities and a few salons scattered across the country
+            city_id = salon_id % 3
+            lat, lon = ((21.03, 105.85), (10.78, 106.70), (16.0, 106.0))[city_id]
+            spread = 0.15 if city_id < 2 else 3.0
+            self.table.append(salon_id, city_id, lat + rng.uniform(-spread, spread),
+                              lon + rng.uniform(-spread, spread), f"salon {salon_id}")
+        self.table.append(400, 0, None, None, "no coordinates")
+        self.table.append(401, None, 21.03, 105.85, "no city")
+        self.index = SalonSpatialIndex(self.table)
+        self.queries = [(rng.uniform(8.0, 23.0), rng.uniform(102.0, 109.0)) for _ in range(50)]
+        self.queries += [(21.03, 105.85), (10.78, 106.70), (30.0, 120.0)]
+
+    def assertSameRanking(self, lat, lon, k, city_id=None):
+        found = self.index.nearest(lat, lon, k, city_id)
+        expected = brute_force(self.table, lat, lon, k, city_id)
+        self.assertEqual([salon.id for _, salon in found], [salon_id for _, salon_id in expected])
+        for (distance, _), (expected_distance, _) in zip(found, expected):
+            self.assertAlmostEqual(distance, expected_distance)
+
+    def test_matches_brute_force_across_cities(self):
+        for lat, lon in self.queries:
+            for k in (1, 5, 20):
+                with self.subTest(lat=lat, lon=lon, k=k):
+                    self.assertSameRanking(lat, lon, k)
+
+    def test_matches_brute_force_within_a_city(self):
+        for lat, lon in self.queries:
+            for city_id in (0, 1, 2):
+                with self.subTest(lat=lat, lon=lon, city_id=city_id):
+                    self.assertSameRanking(lat, lon, 5, city_id)
+
+    def test_salons_without_coordinates_are_left_out(self):
+        self.assertEqual(len(self.index), 401)
+        found = self.index.nearest(21.03, 105.85, 1000)
+        self.assertEqual(len(found), 401)
+        self.assertNotIn(400, [salon.id for _, salon in found])
+
+    def test_nothing_to_return(self):
+        self.assertEqual(self.index.nearest(21.03, 105.85, 0), [])
+        self.assertEqual(self.index.nearest(21.03, 105.85, 5, city_id=99), [])
+        self.assertEqual(SalonSpatialIndex(SalonTable()).nearest(21.03, 105.85), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# test_timeline.py
+# SlotTimeline lookups at the edges of the day and of the free bitmap
+import unittest
+
+from timeline import SlotTimeline, label_to_minutes, round_to_grid, time_to_minutes
+
+
+def timeline(*slots: tuple[int, bool]) -> SlotTimeline:
+    return SlotTimeline([(minutes, free, minutes, 0, f"{minutes // 60}h{minutes % 60}")
+                         for minutes, free in slots])
+
+
+class SlotTimelineTest(unittest.TestCase):
+
+    def setUp(self):
+        # 9h00 free, 9h20 busy, 9h40 busy, 10h00 free, 10h20 busy (given out of order)
+        self.day = timeline((600, True), (540, True), (580, False), (560, False), (620, False))
+
+    def test_slots_are_sorted(self):
+        self.assertEqual(list(self.day.minutes), [540, 560, 580, 600, 620])
+        self.assertEqual(self.day.slot(0)["hourId"], 540)
+
+    def test_find(self):
+        self.assertEqual(self.day.find(580), 2)
+        self.assertIsNone(self.day.find(590))
+        self.assertIsNone(self.day.find(700))
+
+    def test_nearest_free_before_is_strict(self):
+        self.assertEqual(self.day.nearest_free_before(600), 0)
+        self.assertEqual(self.day.nearest_free_before(601), 3)
+        self.assertIsNone(self.day.nearest_free_before(540))
+
+    def test_nearest_free_before_respects_earliest(self):
+        self.assertEqual(self.day.nearest_free_before(580, earliest=540), 0)
+        self.assertIsNone(self.day.nearest_free_before(580, earliest=541))
+
+    def test_nearest_free_after_is_strict(self):
+        self.assertEqual(self.day.nearest_free_after(540), 3)
+        self.assertEqual(self.day.nearest_free_after(539), 0)
+        self.assertIsNone(self.day.nearest_free_after(600))
+        self.assertIsNone(self.day.nearest_free_after(700))
+
+    def test_nearest_free_after_excludes_latest(self):
+        self.assertIsNone(self.day.nearest_free_after(540, latest=600))
+        self.assertEqual(self.day.nearest_free_after(540, latest=601), 3)
+
+    def test_free_between(self):
+        self.assertEqual(list(self.day.free_between(540, 620)), [0, 3])
+        self.assertEqual(list(self.day.free_between(541, 600)), [])
+        self.assertEqual(list(self.day.free_between(0, 24 * 60)), [0, 3])
+
+    def test_empty_and_fully_booked_days(self):
+        for day in (timeline(), timeline((540, False), (560, False))):
+            self.assertIsNone(day.nearest_free_before(24 * 60))
+            self.assertIsNone(day.nearest_free_after(0))
+            self.assertEqual(list(day.free_between(0, 24 * 60)), [])
+        self.assertEqual(len(timeline()), 0)
+        self.assertIsNone(timeline().find(540))
+
+    def test_from_hour_groups(self):
+        day = SlotTimeline.from_hour_groups([
+            {"hours": [{"hour": "9h20", "isFree": 1, "hourId": 2, "subHourId": 7, "hourFrame": "9:20"}]},
+            {"hours": [{"hour": "9h", "isFree": 0, "hourId": 1, "subHourId": 6, "hourFrame": "9:00"}]},
+        ])
+        self.assertEqual(list(day.minutes), [540, 560])
+        self.assertEqual(day.slot(day.nearest_free_after(540)),
+                         {"hourFrame": "9:20", "hourId": 2, "subHourId": 7})
+
+
+class TimeHelpersTest(unittest.TestCase):
+
+    def test_label_to_minutes(self):
+        self.assertEqual(label_to_minutes("9h"), 540)
+        self.assertEqual(label_to_minutes("14h40"), 880)
+
+    def test_time_to_minutes(self):
+        self.assertEqual(time_to_minutes(" 08:05 "), 485)
+        for invalid in ("24:00", "8:60", "8h", "8:"):
+            with self.assertRaises(ValueError):
+                time_to_minutes(invalid)
+
+    def test_round_to_grid(self):
+        self.assertEqual(round_to_grid(559), 540)
+        self.assertEqual(round_to_grid(560), 560)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# timeline.py
+# Compact, sorted view of one salon's slots for one day
+from array import array
+from bisect import bisect_left, bisect_right
+
+SLOT_MINUTES = 20
+
+
+def label_to_minutes(label: str) -> int:
+    """Convert an upstream slot label such as '9h20' to minutes since 00:00."""
+    hour, _, minute = label.partition('h')
+    return int(hour) * 60 + int(minute or 0)
+
+
+def time_to_minutes(time_str: str) -> int:
+    """Convert 'HH:MM' to minutes since 00:00 (raises ValueError when invalid)."""
+    hour, minute = time_str.strip().split(':')
+    hour, minute = int(hour), int(minute)
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"invalid time: {time_str!r}")
+    return hour * 60 + minute
+
+
+def round_to_grid(minutes: int, step: int = SLOT_MINUTES) -> int:
+    """Round down to the booking grid (every 20 minutes)."""
+    return minutes - minutes % step
+
+
+class SlotTimeline:
+    """Slots of a ``hourGroup`` payload flattened into parallel arrays.
+
+    ``minutes`` is sorted; ``free`` is a 0/1 bitmap over it. ``prev_free`` /
+    ``next_free`` hold, for every position, the closest free position at or
+    before / at or after it (-1 if none), so nearest-free lookups are a single
+    bisect plus an array read.
+    """
+
+    __slots__ = ("minutes", "free", "hour_ids", "sub_hour_ids", "frames", "prev_free", "next_free")
+
+    def __init__(self, slots: list[tuple[int, bool, object, object, str]]):
+        slots.sort(key=lambda slot: slot[0])
+        self.minutes = array('H', (slot[0] for slot in slots))
+        self.free = bytearray(1 if slot[1] else 0 for slot in slots)
+        self.hour_ids = [slot[2] for slot in slots]
+        self.sub_hour_ids = [slot[3] for slot in slots]
+        self.frames = [slot[4] for slot in slots]
+
+        size = len(slots)
+        self.prev_free = array('i', [-1]) * size
+        self.next_free = array('i', [-1]) * size
+        last = -1
+        for i in range(size):
+            if self.free[i]:
+                last = i
+            self.prev_free[i] = last
+        last = -1
+        for i in range(size - 1, -1, -1):
+            if self.free[i]:
+                last = i
+            self.next_free[i] = last
+
+    @classmethod
+    def from_hour_groups(cls, hour_groups: list[dict]) -> "SlotTimeline":
+        return cls([
+            (label_to_minutes(hour["hour"]), bool(hour["isFree"]), hour["hourId"],
+             hour["subHourId"], hour["hourFrame"])
+            for group in hour_groups
+            for hour in group["hours"]
+        ])
+
+    def __len__(self) -> int:
+        return len(self.minutes)
+
+    def find(self, minutes: int) -> int | None:
+        """Position of the slot starting exactly at ``minutes``."""
+        i = bisect_left(self.minutes, minutes)
+        if i < len(self.minutes) and self.minutes[i] == minutes:
+            return i
+        return None
+
+    def nearest_free_before(self, minutes: int, earliest: int = 0) -> int | None:
+        """Latest free slot strictly before ``minutes`` and not before ``earliest``."""
+        i = bisect_left(self.minutes, minutes) - 1
+        if i < 0:
+            return None
+        j = self.prev_free[i]
+        if j < 0 or self.minutes[j] < earliest:
+            return None
+        return j
+
+    def nearest_free_after(self, minutes: int, latest: int = 24 * 60) -> int | None:
+        """Earliest free slot strictly after ``minutes`` and before ``latest``."""
+        i = bisect_right(self.minutes, minutes)
+        if i >= len(self.minutes):
+            return None
+        j = self.next_free[i]
+        if j < 0 or self.minutes[j] >= latest:
+            return None
+        return j
+
+    def free_between(self, start: int, end: int):
+        """Yield positions of free slots starting in ``[start, end)``."""
+        i = bisect_left(self.minutes, start)
+        size = len(self.minutes)
+        while i < size:
+            i = self.next_free[i]
+            if i < 0 or self.minutes[i] >= end:
+                return
+            yield i
+            i += 1
+
+    def slot(self, i: int) -> dict:
+        return {
+            "hourFrame": self.frames[i],
+            "hourId": self.hour_ids[i],
+            "subHourId": self.sub_hour_ids[i],
+        }
@@ -1,26 +1,71 @@
 # tools.py
 # MCP tools and prompt for haircut scheduling
+import asyncio
 import json
+from datetime import datetime, timedelta, timezone
 
-import requests
+import httpx
 from mcp.server.fastmcp import FastMCP
+from pydantic import BaseModel, Field
 from typing import Optional
 
-from config import BRANCH_HOURS, CITY_IDS
-from utils import generate_time_slots, euclidean_distance
-
-# Initialize appointments list
-appointments = []
+from admission import Overloaded
+from appointments import appointment_store
+from availability import get_timeline, invalidate_timeline
+from branches import build_branch_index
+from catalog import salon_catalog
+from config import (
+    BATCH_MAX_CONCURRENCY,
+    BATCH_MAX_QUERIES,
+    EARLIEST_SLOT_MAX_DAYS,
+    EARLIEST_SLOT_MAX_SALONS,
+    EARLIEST_SLOT_RESULTS,
+    LOCAL_UTC_OFFSET_HOURS,
+    TOOL_DEADLINE_SECONDS,
+    WORKER_ID,
+)
+from gazetteer import get_gazetteer
+from geocode import geocode
+from metrics import cache_result, error_category, instrument_tool, metrics_endpoint, record_error
+from resilience import with_deadline
+from salons import Salon
+from spatial import build_spatial_index
+from timeline import SlotTimeline, round_to_grid, time_to_minutes
+from warmup import ready_endpoint
+
+LOCAL_TZ = timezone(timedelta(hours=LOCAL_UTC_OFFSET_HOURS))
+APOLOGY = "Dạ xin lỗi, em không thể cung cấp thông tin này."
+BUSY = "Dạ hệ thống đang quá tải, bạn vui lòng thử lại sau ít phút."
+BRANCH_NOT_FOUND = "Không tìm thấy chi nhánh này. Vui lòng kiểm tra lại tên chi nhánh."
 
 
 def init_mcp() -> FastMCP:
     """Initialize FastMCP server."""
-    return FastMCP("haircut_scheduler")
+    settings = {}
+    if WORKER_ID:
+        # Clients post their messages to the worker holding their SSE stream;
+        # the prefix lets a load balancer route those posts back to it
+        settings["message_path"] = f"/{WORKER_ID}/messages/"
+    server = FastMCP("haircut_scheduler", **settings)
+    server.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+    server.custom_route("/ready", methods=["GET"])(ready_endpoint)
+    return server
 
 
 mcp = init_mcp()
 
 
+def apologize(exc: Exception) -> str:
+    """Count the failure by category and return the apology for it."""
+    record_error(error_category(exc))
+    return failure_reply(exc)
+
+
+def failure_reply(exc: Exception) -> str:
+    """Say so explicitly when the call was shed under load, so the user can retry later."""
+    return BUSY if isinstance(exc, Overloaded) else APOLOGY
+
+
 @mcp.prompt(name="collect_booking_info", description="Thu thập thông tin đặt lịch cắt tóc")
 def collect_booking_info(
         user_address: str | None = None,
@@ -44,190 +89,319 @@ def collect_booking_info(
 
 
 @mcp.tool()
-def list_branches() -> str:
+@instrument_tool
+@with_deadline(TOOL_DEADLINE_SECONDS)
+async def list_branches() -> str:
     """List available salon branches."""
-    url = "https://storage.30shine.com/web/v3/configs/get_all_salon.json"
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = json.loads(response.content.decode('utf-8-sig'))
+        data = await salon_catalog.get()
         return (
-            f"Hiện tại bên em đang có {int(data['count'])} chi nhánh khác nhau trên khắp cả nước như "
+            f"Hiện tại bên em đang có {data.count} chi nhánh khác nhau trên khắp cả nước như "
             "Hà Nội, Hồ Chí Minh, Hải Phòng, Bình Dương, Vinh, Đồng Nai. "
             "Anh ở khu vực nào để em giúp tìm salon gần nhất?"
         )
-    except (requests.RequestException, json.JSONDecodeError):
-        return "Dạ xin lỗi, em không thể cung cấp thông tin này."
+    except (httpx.HTTPError, json.JSONDecodeError, KeyError) as exc:
+        return apologize(exc)
+
+
+async def find_nearest_salons(
+        user_address: str, city: str, k: int, include_nearby_cities: bool = False
+) -> list[tuple[float, Salon]] | str:
+    """Return the ``k`` closest ``(distance_km, salon)`` pairs to the user.
+
+    When the location cannot be resolved the reply for the user is returned
+    instead.
+    """
+    gazetteer = get_gazetteer()
+    # Districts and cities resolve offline; only street addresses need the geocoder
+    area = gazetteer.resolve_area(user_address, city)
+    cache_result("gazetteer", "hit" if area is not None else "miss")
+    if area is not None:
+        city_id, lat, lng = area.city_id, area.lat, area.lng
+    else:
+        location = await geocode(user_address, city)
+        if location is None:
+            return "Không tìm thấy địa chỉ phù hợp. Vui lòng thử lại."
+        city_id = gazetteer.city_id(location['county'])
+        if city_id is None:
+            city_id = gazetteer.city_id(city)
+        if city_id is None:
+            return "Không tìm thấy thành phố phù hợp. Vui lòng thử lại."
+        lat, lng = location['lat'], location['lng']
+
+    index = await salon_catalog.derived("spatial", build_spatial_index)
+    return index.nearest(
+        lat, lng, k=k,
+        city_id=None if include_nearby_cities else city_id
+    )
 
 
 @mcp.tool()
-def get_near_salon(user_address: str, city: str) -> str:
+@instrument_tool
+@with_deadline(TOOL_DEADLINE_SECONDS)
+async def get_near_salon(user_address: str, city: str, include_nearby_cities: bool = False) -> str:
     """Suggest the nearest salon based on user address and city.
     Args:
         user_address (str): The street address or specific location provided by the user
         city (str): The city name where the user is located
+        include_nearby_cities (bool): Also suggest salons in neighbouring provinces (e.g. Bình Dương for Thủ Đức)
     """
-    url = f"https://geocode.search.hereapi.com/v1/geocode?q={user_address}+{city}&apiKey=A7V_JCsxV2Y_A_WBg00q_mUB-bDCynwEhwaZeT6QfwY&limit=1"
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = json.loads(response.content.decode('utf-8-sig'))
-        res = data["items"][0]
-        city_id = CITY_IDS.get(res['address']['county'])
-        if city_id is None:
-            return "Không tìm thấy thành phố phù hợp. Vui lòng thử lại."
-
-        lat_lon = res['position']
-        near_salon = {'city_id': city_id, 'lat': lat_lon['lat'], 'lon': lat_lon['lng']}
-
-        url_get_all_salon = "https://storage.30shine.com/web/v3/configs/get_all_salon.json"
-        response = requests.get(url_get_all_salon, timeout=5)
-        response.raise_for_status()
-        data = json.loads(response.content.decode('utf-8-sig'))
-
-        salons = [x for x in data["data"] if x["cityId"] == near_salon['city_id']]
-        salons.sort(
-            key=lambda x: euclidean_distance(
-                near_salon['lat'], near_salon['lon'], x['latitude'], x['longitude']
-            )
-        )
+        salons = await find_nearest_salons(user_address, city, 5, include_nearby_cities)
+        if isinstance(salons, str):
+            return salons
 
         if not salons:
             return "Không tìm thấy salon nào gần khu vực của bạn."
 
         list_salon = "Danh sách salon\n" + "\n".join(
-            f"- **{x['addressNew']}**" for x in salons[:5]
+            f"- **{x.address}**" for _, x in salons
         )
         return list_salon
-    except (requests.RequestException, json.JSONDecodeError, KeyError):
-        return "Dạ xin lỗi, em không thể cung cấp thông tin này."
+    except (httpx.HTTPError, json.JSONDecodeError, KeyError) as exc:
+        return apologize(exc)
+
+
+async def find_salon(branch: str) -> tuple[int, str] | None:
+    """Resolve a branch address to its salon id and catalog name (``addressNew``)."""
+    index = await salon_catalog.derived("branches", build_branch_index)
+    salon_id = index.resolve(branch)
+    if salon_id is None:
+        return None
+    return salon_id, index.name(salon_id)
+
+
+async def invalidate_availability(branch: str, date: str) -> None:
+    """Drop the cached availability snapshot touched by a booking."""
+    try:
+        salon = await find_salon(branch)
+    except (httpx.HTTPError, json.JSONDecodeError, KeyError):
+        return
+    if salon is not None:
+        await invalidate_timeline(salon[0], date)
+
+
+def describe_availability(timeline: SlotTimeline, minutes: int) -> dict:
+    """Look up one requested time in a salon's timeline.
+
+    The time is rounded down to the 20-minute booking grid; the nearest free
+    slots are searched within 4 hours either side of the requested hour.
+    """
+    slot_minutes = round_to_grid(minutes)
+    hour_start = slot_minutes - slot_minutes % 60
+    result = {"isFree": False, "hourId": "", "subHourId": "",
+              "nearest_free_before_booked_time": None, "nearest_free_after_booked_time": None}
+
+    position = timeline.find(slot_minutes)
+    if position is not None:
+        result["isFree"] = bool(timeline.free[position])
+        result["hourId"] = timeline.hour_ids[position]
+        result["subHourId"] = timeline.sub_hour_ids[position]
+
+    before = timeline.nearest_free_before(slot_minutes, earliest=hour_start - 4 * 60)
+    after = timeline.nearest_free_after(slot_minutes, latest=hour_start + 5 * 60)
+    if before is not None:
+        result["nearest_free_before_booked_time"] = timeline.slot(before)
+    if after is not None:
+        result["nearest_free_after_booked_time"] = timeline.slot(after)
+    return result
+
+
+def availability_message(result: dict) -> str:
+    """Turn a ``describe_availability`` result into the reply for the user."""
+    if result["isFree"]:
+        return "Còn slot"
+    frames = [
+        slot["hourFrame"]
+        for slot in (result["nearest_free_before_booked_time"], result["nearest_free_after_booked_time"])
+        if slot is not None
+    ]
+    if len(frames) == 2:
+        return f"Hết slot. Hai khung giờ gần nhất còn slot là {frames[0]} và {frames[1]}"
+    if frames:
+        return f"Hết slot. Khung giờ gần nhất còn slot là {frames[0]}"
+    return "Hết slot. Không còn khung giờ trống nào gần thời gian này."
 
 
 @mcp.tool()
-def check_availability(branch: str, date: str, time: str):
+@instrument_tool
+@with_deadline(TOOL_DEADLINE_SECONDS)
+async def check_availability(branch: str, date: str, time: str):
     """Check available time slots for a specific branch and date.
     Args:
             time (Optional[str]): The time of the appointment in 'HH:MM' format (e.g., 14:30). Must be between 08:00 and 20:00
             branch (Optional[str]): The name of the salon branch
             date (Optional[str]): The date of the appointment in DD-MM_YYYY format
     """
-
-    # Get salon id
-    url = f"https://storage.30shine.com/web/v3/configs/get_all_salon.json?"
     try:
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        data = json.loads(response.content.decode('utf-8-sig'))
-        all_salon = data["data"]
-        id_salon = None
-        for salon in all_salon:
-            if salon["addressNew"] == branch:
-                id_salon = salon["id"]
-                break
+        minutes = time_to_minutes(time)
+    except ValueError:
+        return "Định dạng giờ không hợp lệ. Vui lòng sử dụng định dạng HH:MM."
 
+    try:
+        # Get salon id
+        salon = await find_salon(branch)
+        if salon is None:
+            return BRANCH_NOT_FOUND
+        id_salon, address = salon
         # Check available slot
-        check_slot_url = f"https://3sgus10dig.execute-api.ap-southeast-1.amazonaws.com/Prod/booking-view-service/api/v1/booking/book-hours-group?salonId={id_salon}&bookDate={date}&timeRequest={time}"
+        timeline = await get_timeline(id_salon, date, time)
+        # Name the salon actually checked: the branch may have been matched loosely
+        return f"Chi nhánh **{address}**: " + availability_message(describe_availability(timeline, minutes))
+    except (httpx.HTTPError, json.JSONDecodeError, KeyError, ValueError) as exc:
+        return apologize(exc)
 
+
+class AvailabilityQuery(BaseModel):
+    branch: str = Field(description="The name of the salon branch")
+    date: str = Field(description="The date of the appointment in DD-MM-YYYY format")
+    time: str = Field(description="The time of the appointment in 'HH:MM' format (e.g., 14:30)")
+
+
+@mcp.tool()
+@instrument_tool
+@with_deadline(TOOL_DEADLINE_SECONDS)
+async def check_availability_batch(queries: list[AvailabilityQuery]) -> list[dict]:
+    """Check several (branch, date, time) combinations in one call.
+    Use this instead of calling check_availability repeatedly when comparing
+    several times or several nearby salons. Only the first BATCH_MAX_QUERIES items (50 by default)
+    are checked; the others come back with an error message.
+    Args:
+            queries (list): Items with branch, date (DD-MM-YYYY) and time (HH:MM)
+    """
+    results = [{"branch": q.branch, "date": q.date, "time": q.time} for q in queries]
+    # Queries past the limit are answered with an error rather than dropped
+    for result in results[BATCH_MAX_QUERIES:]:
+        result["message"] = (f"Mỗi lần chỉ kiểm tra được tối đa {BATCH_MAX_QUERIES} yêu cầu. "
+                             "Vui lòng gửi yêu cầu này trong lần kiểm tra tiếp theo.")
+    queries = queries[:BATCH_MAX_QUERIES]
+
+    try:
+        salons = {branch: await find_salon(branch) for branch in {q.branch for q in queries}}
+    except (httpx.HTTPError, json.JSONDecodeError, KeyError) as exc:
+        message = apologize(exc)
+        for result in results[:len(queries)]:
+            result["message"] = message
+        return results
+
+    # One upstream fetch per (salon, date), shared by every query on that day
+    groups: dict[tuple[int, str], list[int]] = {}
+    for i, q in enumerate(queries):
         try:
-            response_slot = requests.get(check_slot_url, timeout=5)
-            response_slot.raise_for_status()
-            data_slot = json.loads(response_slot.content.decode('utf-8-sig'))
-            list_hours = data_slot["data"]["hourGroup"]
-
-            # Tách phần giờ và phút từ chuỗi thời gian
-            hour, minute = time.split(':')  # Lấy giờ và phút
-            # Định dạng lại ngày giờ
-            hour = hour.lstrip("0")
-            if int(minute) % 20 != 0:
-                convert_minute = (int(minute) // 20) * 20
-                if convert_minute == 0:
-                    minute = str(convert_minute) + "0"
-                else:
-                    minute = str((int(minute) // 20) * 20)
-
-            hour_minute = f"{hour}h{minute}"  # Định dạng giờ phút theo chuẩn
-
-            # Tìm nhóm giờ hiện tại
-            find_hour_group = next(
-                (hourGroup for hourGroup in list_hours if hourGroup['name'] == hour),
-                None
-            )
+            results[i]["minutes"] = time_to_minutes(q.time)
+        except ValueError:
+            results[i]["message"] = "Định dạng giờ không hợp lệ. Vui lòng sử dụng định dạng HH:MM."
+            continue
+        if salons[q.branch] is None:
+            results[i]["message"] = BRANCH_NOT_FOUND
+            continue
+        salon_id, results[i]["salon"] = salons[q.branch]
+        groups.setdefault((salon_id, q.date), []).append(i)
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def check_group(salon_id: int, date: str, positions: list[int]) -> None:
+        async with semaphore:
+            try:
+                timeline = await get_timeline(salon_id, date, queries[positions[0]].time)
+            except (httpx.HTTPError, json.JSONDecodeError, KeyError, ValueError) as exc:
+                message = apologize(exc)
+                for i in positions:
+                    results[i]["message"] = message
+                return
+        for i in positions:
+            availability = describe_availability(timeline, results[i]["minutes"])
+            results[i].update(availability, message=availability_message(availability))
+
+    await asyncio.gather(*(check_group(salon_id, date, positions)
+                           for (salon_id, date), positions in groups.items()))
+    for result in results:
+        result.pop("minutes", None)
+    return results
 
-            # Kết quả trả về
-            return_response= {"isFree": False, "hourId": "", "subHourId": "", "nearest_free_before": None,
-                        "nearest_free_after": None}
-
-            if find_hour_group:
-                # Tìm thời gian khớp trong nhóm giờ hiện tại
-                time_matching = next(
-                    (hour for hour in find_hour_group['hours'] if hour['hour'] == hour_minute),
-                    None
-                )
-
-                # Kiểm tra nếu `time_matching` tồn tại và có `isFree = True`
-                if time_matching:
-                    return_response["isFree"] = time_matching["isFree"]
-                    return_response["hourId"] = time_matching["hourId"]
-                    return_response["subHourId"] = time_matching["subHourId"]
-
-                    # Lấy giờ hiện tại
-                    current_hour = int(hour)
-
-                    def time_to_minutes(time_str):
-                        """
-                        Chuyển chuỗi giờ dạng 'hhhmm' thành số phút kể từ 00:00.
-                        """
-                        hour, minute = map(int, time_str.replace('h', ':').split(':'))
-                        return hour * 60 + minute
-
-                    # Hàm tìm giờ gần nhất trống trong danh sách
-                    def find_nearest_free(hours, target_hour):
-                        target_minutes = time_to_minutes(target_hour)
-                        before = after = None
-                        for h in hours:
-                            if h["isFree"]:
-                                current_minutes = time_to_minutes(h["hour"])
-                                if current_minutes < target_minutes:
-                                    before = h
-                                elif current_minutes > target_minutes and after is None:
-                                    after = h
-                        return before, after
-
-                    # Tìm giờ trống trong phạm vi 1 tiếng liền kề
-                    relevant_hour_groups = [
-                        group for group in list_hours
-                        if current_hour - 4 <= int(group["name"]) <= current_hour + 4
-                    ]
-                    all_hours = [hour for group in relevant_hour_groups for hour in group["hours"]]
-                    nearest_before, nearest_after = find_nearest_free(all_hours, time_matching["hour"])
-
-                    # Gán kết quả giờ gần nhất trước và sau vào response
-                    return_response["nearest_free_before_booked_time"] = {
-                        "hourFrame": nearest_before["hourFrame"],
-                        "hourId": nearest_before["hourId"],
-                        "subHourId": nearest_before["subHourId"],
-                    } if nearest_before else None
-
-                    return_response["nearest_free_after_booked_time"] = {
-                        "hourFrame": nearest_after["hourFrame"],
-                        "hourId": nearest_after["hourId"],
-                        "subHourId": nearest_after["subHourId"],
-                    } if nearest_after else None
-            if return_response["isFree"]:
-                return "Còn slot"
 
-            else:
-                before_time = return_response["nearest_free_before_booked_time"]["hourFrame"]
-                after_time = return_response["nearest_free_after_booked_time"]["hourFrame"]
-                return f"Hết slot. Hai khung giờ gần nhất còn slot là {before_time} và {after_time}"
+@mcp.tool()
+@instrument_tool
+@with_deadline(TOOL_DEADLINE_SECONDS)
+async def find_earliest_slot(
+        user_address: str,
+        city: str,
+        start_time: str = "08:00",
+        end_time: str = "20:00",
+        days: int = 3,
+        include_nearby_cities: bool = False
+) -> str:
+    """Find the soonest free slots at the salons nearest to the user.
+    Args:
+        user_address (str): The street address or specific location provided by the user
+        city (str): The city name where the user is located
+        start_time (str): Earliest acceptable time of day in 'HH:MM' format
+        end_time (str): Latest acceptable time of day in 'HH:MM' format
+        days (int): How many days to search, starting today
+        include_nearby_cities (bool): Also consider salons in neighbouring provinces
+    """
+    try:
+        window_start, window_end = time_to_minutes(start_time), time_to_minutes(end_time)
+    except ValueError:
+        return "Định dạng giờ không hợp lệ. Vui lòng sử dụng định dạng HH:MM."
+    days = max(1, min(days, EARLIEST_SLOT_MAX_DAYS))
+
+    try:
+        salons = await find_nearest_salons(user_address, city, EARLIEST_SLOT_MAX_SALONS, include_nearby_cities)
+    except (httpx.HTTPError, json.JSONDecodeError, KeyError) as exc:
+        return apologize(exc)
+    if isinstance(salons, str):
+        return salons
+    if not salons:
+        return "Không tìm thấy salon nào gần khu vực của bạn."
+
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    now = datetime.now(LOCAL_TZ)
+    failed: Exception | None = None
+
+    async def first_free(distance: float, salon: Salon, date: str, earliest: int):
+        nonlocal failed
+        async with semaphore:
+            try:
+                timeline = await get_timeline(salon.id, date, start_time)
+            except (httpx.HTTPError, json.JSONDecodeError, KeyError, ValueError) as exc:
+                record_error(error_category(exc))
+                failed = exc
+                return None
+        position = next(timeline.free_between(earliest, window_end), None)
+        if position is None:
+            return None
+        return timeline.minutes[position], distance, salon, timeline.frames[position]
+
+    for offset in range(days):
+        day = now + timedelta(days=offset)
+        date = day.strftime("%d-%m-%Y")
+        earliest = window_start
+        if offset == 0:
+            earliest = max(earliest, now.hour * 60 + now.minute + 1)
+        if earliest >= window_end:
+            continue
+
+        found = await asyncio.gather(*(first_free(distance, salon, date, earliest) for distance, salon in salons))
+        options = sorted(
+            (option for option in found if option is not None), key=lambda option: option[:2]
+        )[:EARLIEST_SLOT_RESULTS]
+        # Every later day starts later, so the first day with a free slot wins
+        if options:
+            return "Các khung giờ trống sớm nhất\n" + "\n".join(
+                f"- **{frame}** ngày {date} tại **{salon.address}** (cách khoảng {distance:.1f} km)"
+                for _, distance, salon, frame in options
+            )
 
-        except (requests.RequestException, json.JSONDecodeError, KeyError):
-            return "Dạ xin lỗi, em không thể cung cấp thông tin này."
-    except (requests.RequestException, json.JSONDecodeError, KeyError):
-        return "Dạ xin lỗi, em không thể cung cấp thông tin này."
+    # Some salons could not be checked (upstream down or out of time budget)
+    if failed is not None:
+        return failure_reply(failed)
+    return f"Không còn khung giờ trống nào trong {days} ngày tới tại các salon gần bạn."
 
 
 @mcp.tool()
+@instrument_tool
+@with_deadline(TOOL_DEADLINE_SECONDS)
 async def book_appointment(
         time: Optional[str] = None,
         branch: Optional[str] = None,
@@ -237,7 +411,7 @@ async def book_appointment(
     """Book a haircut appointment.
         Args:
             time (Optional[str]): The time of the appointment in 'HH:MM' format (e.g., "14:30"). Must be between 08:00 and 20:00
-            branch (Optional[str]): The name of the salon branch (e.g., "Cơ sở Hà Nội").
+            branch (Optional[str]): The salon address as listed by get_near_salon (e.g., "82 Trần Đại Nghĩa, Hai Bà Trưng, Hà Nội").
             date (Optional[str]): The date of the appointment in 'DD-MM_YYYY format (e.g., "10-05-2025").
             phone (Optional[str]): The user's phone number for confirming the appointment.
     """
@@ -251,31 +425,41 @@ async def book_appointment(
         return "\n".join(texts)
 
     try:
-        hour = int(time.split(":")[0])
-        if hour < 8 or hour > 20:
-            return "Giờ đặt không hợp lệ. Vui lòng chọn khung giờ từ 08:00 đến 20:00."
+        minutes = time_to_minutes(time)
     except ValueError:
         return "Định dạng giờ không hợp lệ. Vui lòng sử dụng định dạng HH:MM."
+    if minutes < 8 * 60 or minutes > 20 * 60:
+        return "Giờ đặt không hợp lệ. Vui lòng chọn khung giờ từ 08:00 đến 20:00."
 
-    for appt in appointments:
-        if appt["branch"] == branch and appt["date"] == date and appt["time"] == time:
-            return "Khung giờ này đã được đặt. Vui lòng chọn khung giờ khác."
+    try:
+        salon = await find_salon(branch)
+    except (httpx.HTTPError, json.JSONDecodeError, KeyError) as exc:
+        return apologize(exc)
+    if salon is None:
+        return BRANCH_NOT_FOUND
+    salon_id, address = salon
+    # Same slot as check_availability reports, whatever the spelling of the time
+    slot = round_to_grid(minutes)
+    slot_time = f"{slot // 60:02d}:{slot % 60:02d}"
+
+    if not await appointment_store.book(salon_id, address, date, slot, slot_time, phone):
+        return "Khung giờ này đã được đặt. Vui lòng chọn khung giờ khác."
 
-    appointments.append({
-        "branch": branch,
-        "date": date,
-        "time": time,
-        "phone": phone
-    })
-    return f"Đã đặt lịch thành công tại {branch} vào {date} lúc {time} cho số điện thoại {phone}."
+    await invalidate_timeline(salon_id, date)
+    return f"Đã đặt lịch thành công tại {address} vào {date} lúc {slot_time} cho số điện thoại {phone}."
 
 
 @mcp.tool()
-def cancel_appointment(phone: str) -> str:
+@instrument_tool
+@with_deadline(TOOL_DEADLINE_SECONDS)
+async def cancel_appointment(phone: str) -> str:
     """Cancel an appointment based on phone number."""
-    global appointments
-    initial_count = len(appointments)
-    appointments = [appt for appt in appointments if appt["phone"] != phone]
-    if len(appointments) < initial_count:
+    cancelled = await appointment_store.cancel(phone)
+    if cancelled:
+        for appt in cancelled:
+            if appt["salon_id"] is not None:
+                await invalidate_timeline(appt["salon_id"], appt["date"])
+            else:
+                await invalidate_availability(appt["branch"], appt["date"])
         return f"Đã hủy lịch hẹn cho số điện thoại {phone}."
     return f"Không tìm thấy lịch hẹn cho số điện thoại {phone}."
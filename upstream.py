@@ -0,0 +1,211 @@
+# upstream.py
+# Shared async HTTP client for every upstream API call
+import asyncio
+import json
+import random
+import time
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from admission import Overloaded, get_scheduler
+from config import (
+    UPSTREAM_KEEPALIVE_SECONDS,
+    UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+    UPSTREAM_MAX_RETRIES,
+    UPSTREAM_RETRY_BACKOFF_SECONDS,
+    UPSTREAM_TIMEOUT_SECONDS,
+)
+from metrics import STEP_LATENCY, UPSTREAM_HEDGES, UPSTREAM_IN_FLIGHT, UPSTREAM_LATENCY, UPSTREAM_RETRIES, span
+from resilience import CircuitBreaker, CircuitOpenError, DeadlineExceeded, get_breaker, get_tracker, remaining
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 in httpx when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# One pooled keep-alive client per upstream host, so each host gets its own
+# connection limit and a slow host cannot exhaust connections of the others
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    """Return the shared client for the host of ``url``."""
+    host = urlsplit(url).netloc
+    client = _clients.get(host)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            timeout=UPSTREAM_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+                max_keepalive_connections=UPSTREAM_MAX_CONNECTIONS_PER_HOST,
+                keepalive_expiry=UPSTREAM_KEEPALIVE_SECONDS,
+            ),
+        )
+        _clients[host] = client
+    return client
+
+
+async def send(url: str, params: dict | None = None, headers: dict | None = None) -> httpx.Response:
+    """GET ``url`` resiliently and return the last response, whatever its status.
+
+    Every attempt fits in the remaining budget of the current tool call (see
+    ``resilience.deadline``). A request slower than the host's recent p95 gets
+    a hedged duplicate; timeouts, connection errors, 429 and 5xx answers are
+    retried with jittered backoff; and a host that keeps failing trips its
+    circuit breaker so callers fail fast instead of waiting on it. Attempts
+    go through the host's admission scheduler; ``Overloaded`` is raised when
+    the host is too busy to answer within the budget.
+    """
+    host = urlsplit(url).netloc
+    breaker = get_breaker(host)
+    for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {host}")
+        try:
+            response = await _hedged(host, url, params, headers)
+        except Overloaded:
+            # Shed before being sent: neither a failure of the host nor worth retrying
+            breaker.abandon()
+            raise
+        except (httpx.TimeoutException, httpx.TransportError):
+            left = remaining()
+            if left is not None and left <= 0:
+                # Out of budget: that says nothing about the health of the host
+                breaker.abandon()
+            else:
+                breaker.record_failure()
+            if not _may_retry(attempt):
+                raise
+        except BaseException:
+            # Cancelled, or failed in a way that says nothing about the host
+            # (DecodingError, InvalidURL...): never leave a half-open trial pending
+            breaker.abandon()
+            raise
+        else:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code not in RETRY_STATUSES or not _may_retry(attempt):
+                return response
+        UPSTREAM_RETRIES.inc(upstream=host)
+        await asyncio.sleep(random.uniform(0, _backoff(attempt)))
+
+
+def _backoff(attempt: int) -> float:
+    return UPSTREAM_RETRY_BACKOFF_SECONDS * 2 ** attempt
+
+
+def _may_retry(attempt: int) -> bool:
+    if attempt >= UPSTREAM_MAX_RETRIES:
+        return False
+    # Retry only when the backoff still leaves time for a useful attempt
+    left = remaining()
+    return left is None or left > 4 * _backoff(attempt)
+
+
+async def _hedged(host: str, url: str, params: dict | None, headers: dict | None) -> httpx.Response:
+    """One request, plus a duplicate if the first is slower than usual; first good answer wins."""
+    delay = get_tracker(host).hedge_delay() if get_breaker(host).state == CircuitBreaker.CLOSED else None
+    scheduler = get_scheduler(host)
+    loop = asyncio.get_running_loop()
+    primary = loop.create_task(_admitted(scheduler, host, url, params, headers))
+    tasks = {primary}
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            left = remaining()
+            # Hedges are extra load: only sent when the host has spare capacity right now
+            if not done and (left is None or left > delay) and scheduler.try_acquire():
+                tasks.add(loop.create_task(_admitted(scheduler, host, url, params, headers, granted=True)))
+        failure: httpx.Response | BaseException | None = None
+        pending = tasks
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                outcome = task.exception() or task.result()
+                if isinstance(outcome, httpx.Response) and outcome.status_code < 500:
+                    if len(tasks) > 1:
+                        UPSTREAM_HEDGES.inc(upstream=host, winner="primary" if task is primary else "hedge")
+                    return outcome
+                failure = failure or outcome
+        if isinstance(failure, BaseException):
+            raise failure
+        return failure
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _admitted(scheduler, host: str, url: str, params: dict | None, headers: dict | None,
+                    granted: bool = False) -> httpx.Response:
+    async with scheduler.slot(granted):
+        return await _attempt(host, url, params, headers)
+
+
+async def _attempt(host: str, url: str, params: dict | None, headers: dict | None) -> httpx.Response:
+    """A single GET through the pooled client, recording latency per host and status."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"no time left for {host}")
+    timeout = UPSTREAM_TIMEOUT_SECONDS if left is None else min(UPSTREAM_TIMEOUT_SECONDS, left)
+    status = "error"
+    started = time.perf_counter()
+    try:
+        with UPSTREAM_IN_FLIGHT.track(upstream=host), span("upstream", upstream=host):
+            response = await get_client(url).get(url, params=params, headers=headers, timeout=timeout)
+        status = str(response.status_code)
+        if response.status_code < 500:
+            get_tracker(host).record(time.perf_counter() - started)
+        return response
+    except httpx.TimeoutException:
+        status = "timeout"
+        raise
+    except asyncio.CancelledError:
+        status = "cancelled"
+        raise
+    finally:
+        UPSTREAM_LATENCY.observe(time.perf_counter() - started, upstream=host, status=status)
+
+
+async def get(url: str, params: dict | None = None, headers: dict | None = None) -> httpx.Response:
+    """GET ``url`` through the pooled client and raise on HTTP errors."""
+    response = await send(url, params=params, headers=headers)
+    response.raise_for_status()
+    return response
+
+
+async def get_json(url: str, params: dict | None = None) -> Any:
+    """GET ``url`` and decode the (possibly BOM-prefixed) JSON body."""
+    response = await get(url, params=params)
+    return decode_json(response.content)
+
+
+def decode_json(content: bytes) -> Any:
+    """Decode a (possibly BOM-prefixed) JSON body."""
+    with STEP_LATENCY.time(step="json_decode"), span("json_decode"):
+        return json.loads(content.decode('utf-8-sig'))
+
+
+async def preconnect(url: str) -> None:
+    """Open a keep-alive connection to the host of ``url`` ahead of real traffic.
+
+    Any answer will do (even 4xx): the point is the DNS lookup, TCP and TLS
+    handshakes. Bypasses retries and circuit breakers.
+    """
+    left = remaining()
+    timeout = UPSTREAM_TIMEOUT_SECONDS if left is None else min(UPSTREAM_TIMEOUT_SECONDS, max(left, 0.001))
+    await get_client(url).head(url, timeout=timeout)
+
+
+async def aclose() -> None:
+    """Close every pooled connection."""
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
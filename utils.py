@@ -1,7 +1,13 @@
 # utils.py
 # Utility functions for the haircut scheduler
+import math
+import re
+import unicodedata
 from datetime import datetime, timedelta
 
+EARTH_RADIUS_KM = 6371.0088
+
+
 def generate_time_slots(start_time_str: str, end_time_str: str, interval_minutes: int) -> list[str]:
     """Generate available time slots between start and end times with specified interval."""
     start_time = datetime.strptime(start_time_str, "%H:%M")
@@ -13,8 +19,45 @@ def generate_time_slots(start_time_str: str, end_time_str: str, interval_minutes
         current_time += timedelta(minutes=interval_minutes)
     return slots
 
-def euclidean_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate squared Euclidean distance between two points (no square root for efficiency)."""
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    return dlat ** 2 + dlon ** 2
\ No newline at end of file
+
+def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate the great-circle distance between two points in kilometres."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# Common Vietnamese address abbreviations, applied after diacritics are stripped
+ADDRESS_ABBREVIATIONS = [
+    (re.compile(r"\btp\.?\s*hcm\b"), "ho chi minh"),
+    (re.compile(r"\btp\.?\s+|\btp\b"), "thanh pho "),
+    (re.compile(r"\btx\.\s*|\btx\b"), "thi xa "),
+    (re.compile(r"\bq\.\s*|\bq(?=\s*\d)"), "quan "),
+    (re.compile(r"\bp\.\s*|\bp(?=\s*\d)"), "phuong "),
+    (re.compile(r"\bh\.\s*"), "huyen "),
+    (re.compile(r"\bd\.\s*"), "duong "),
+]
+
+
+def strip_diacritics(text: str) -> str:
+    """Remove Vietnamese diacritics (including đ/Đ) from a string."""
+    decomposed = unicodedata.normalize("NFD", text.replace("đ", "d").replace("Đ", "D"))
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def normalize_text(text: str) -> str:
+    """Case-fold, strip diacritics and collapse punctuation/whitespace."""
+    text = strip_diacritics(text).casefold()
+    text = re.sub(r"[^\w.]+", " ", text)
+    return " ".join(text.split())
+
+
+def normalize_address(text: str) -> str:
+    """Normalize an address and expand abbreviations such as "P." and "Q."."""
+    text = normalize_text(text)
+    for pattern, replacement in ADDRESS_ABBREVIATIONS:
+        text = pattern.sub(replacement, text)
+    return " ".join(text.replace(".", " ").split())
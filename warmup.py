@@ -0,0 +1,157 @@
+# warmup.py
+# Startup warm-up and the readiness endpoint
+import asyncio
+import contextlib
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+import upstream
+from availability import get_timeline
+from branches import build_branch_index
+from catalog import salon_catalog
+from config import (
+    BATCH_MAX_CONCURRENCY,
+    BOOK_HOURS_URL,
+    CATALOG_RETRY_SECONDS,
+    HERE_GEOCODE_URL,
+    HOT_LIST_SAVE_SECONDS,
+    LOCAL_UTC_OFFSET_HOURS,
+    SALON_CATALOG_URL,
+    WARMUP_PREFILL_SALONS,
+    WARMUP_TIMEOUT_SECONDS,
+)
+from gazetteer import get_gazetteer
+from geocode import geocode_cache
+from hotlist import hot_list
+from metrics import STEP_LATENCY
+from resilience import deadline
+from spatial import build_spatial_index
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Runs once at server start; the server reports ready when it is done.
+
+    The catalog and its indexes are required: loading them is retried until
+    it succeeds, and only they decide readiness. The other steps are best
+    effort: whatever goes wrong in them is logged and reported as failed,
+    and pre-connecting and cache pre-filling are bounded by
+    ``WARMUP_TIMEOUT_SECONDS``.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.steps: dict[str, str] = {}
+
+    async def run(self) -> None:
+        started = time.monotonic()
+        results = await asyncio.gather(
+            self._step("catalog", self._load_catalog),
+            self._step("connect", self._connect, WARMUP_TIMEOUT_SECONDS),
+            self._step("geocode", self._prefill_geocode, WARMUP_TIMEOUT_SECONDS),
+            self._step("availability", self._prefill_availability, WARMUP_TIMEOUT_SECONDS),
+            self._step("gazetteer", self._load_gazetteer),
+        )
+        self.ready = results[0]
+        logger.info("Warm-up finished in %.2f s: %s", time.monotonic() - started, self.steps)
+
+    async def _step(self, name: str, step, timeout: float | None = None) -> bool:
+        """Run one step and record its outcome; ``True`` if it succeeded."""
+        self.steps[name] = "running"
+        try:
+            budget = deadline(timeout) if timeout is not None else contextlib.nullcontext()
+            with STEP_LATENCY.time(step=f"warmup_{name}"), budget:
+                self.steps[name] = await step()
+            return True
+        except Exception as exc:  # noqa: BLE001 - a broken step must not keep the server unready
+            logger.warning("Warm-up step %s failed: %r", name, exc, exc_info=True)
+            self.steps[name] = f"failed: {exc!r}"
+            return False
+
+    @staticmethod
+    async def _connect() -> str:
+        """Open a pooled connection (DNS, TCP, TLS) to every upstream host."""
+        urls = (SALON_CATALOG_URL, HERE_GEOCODE_URL, BOOK_HOURS_URL)
+        results = await asyncio.gather(*(upstream.preconnect(url) for url in urls), return_exceptions=True)
+        return f"{sum(not isinstance(r, BaseException) for r in results)}/{len(urls)} hosts"
+
+    @staticmethod
+    async def _load_catalog() -> str:
+        while True:
+            try:
+                salons = await salon_catalog.get()
+                await salon_catalog.derived("spatial", build_spatial_index)
+                await salon_catalog.derived("branches", build_branch_index)
+                return f"{len(salons)} salons"
+            except Exception as exc:  # noqa: BLE001 - the catalog is required: keep trying
+                logger.warning("Warm-up: salon catalog not loaded yet (%r), retrying", exc)
+                await asyncio.sleep(CATALOG_RETRY_SECONDS)
+
+    @staticmethod
+    async def _prefill_geocode() -> str:
+        loaded = await geocode_cache.preload(hot_list.top_addresses(hot_list.size))
+        return f"{loaded} addresses"
+
+    @staticmethod
+    async def _prefill_availability() -> str:
+        salon_ids = hot_list.top_salons(WARMUP_PREFILL_SALONS)
+        today = datetime.now(timezone(timedelta(hours=LOCAL_UTC_OFFSET_HOURS))).strftime("%d-%m-%Y")
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+        async def prefill(salon_id: int) -> None:
+            async with semaphore:
+                # Not a user request: must not push the salon up its own ranking
+                await get_timeline(salon_id, today, "08:00", record=False)
+
+        results = await asyncio.gather(*(prefill(salon_id) for salon_id in salon_ids), return_exceptions=True)
+        return f"{sum(r is None for r in results)}/{len(salon_ids)} salons"
+
+    @staticmethod
+    async def _load_gazetteer() -> str:
+        """Parse the bundled gazetteer now rather than on the first get_near_salon call."""
+        await asyncio.to_thread(get_gazetteer)
+        return "loaded"
+
+
+warm_up = WarmUp()
+
+
+async def save_hot_list_periodically() -> None:
+    while True:
+        await asyncio.sleep(HOT_LIST_SAVE_SECONDS)
+        try:
+            hot_list.save()
+        except OSError as exc:
+            logger.warning("Could not save hot list: %s", exc)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Warm up in the background while the server already accepts connections.
+
+    The load balancer keeps traffic away until ``/ready`` answers 200.
+    """
+    hot_list.load()
+    loop = asyncio.get_running_loop()
+    tasks = [loop.create_task(warm_up.run()), loop.create_task(save_hot_list_periodically())]
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        with contextlib.suppress(OSError):
+            hot_list.save()
+        await upstream.aclose()
+
+
+async def ready_endpoint(request: Request) -> JSONResponse:
+    """Readiness probe: 200 once warm-up has finished, 503 before."""
+    return JSONResponse(
+        {"ready": warm_up.ready, "steps": warm_up.steps},
+        status_code=200 if warm_up.ready else 503,
+    )